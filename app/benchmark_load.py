@@ -0,0 +1,274 @@
+"""
+Reproducible load test for the memory API
+
+Starts the API against local stand-ins - embedded Qdrant (QDRANT_PATH) and
+the OpenAI-compatible stub in llm_stub.py for both the LLM and the
+embedder - then drives add, search, get_all and admin scroll requests at a
+fixed concurrency with Thai/English conversations like TEST_SCENARIOS.txt.
+
+Reports throughput, p50/p95/p99 latency and p50/p95/p99 per stage (embed,
+llm, vector, graph, tagging, from the Server-Timing header) for every
+operation, printed and written as JSON so runs can be compared.
+
+Usage:
+    python benchmark_load.py [concurrency] [requests_per_operation] [output.json]
+    python benchmark_load.py 16 400 bench-16.json
+
+Environment:
+    BENCH_URL              benchmark a running API instead of starting one
+    BENCH_OPERATIONS       add,search,get_all,admin_scroll (run in this order)
+    BENCH_USERS            users the requests are spread over (8)
+    BENCH_LLM_LATENCY_MS   stub LLM latency per call (200, +/- BENCH_LLM_JITTER_MS 50;
+                           "recorded" replays the cassette's latencies)
+    BENCH_LLM_CASSETTE     replay real LLM replies recorded with llm_stub.py
+    BENCH_QDRANT           ":memory:" (default), a directory, or "server" for QDRANT_HOST
+    BENCH_REAL_EMBEDDER    true to embed with the configured model instead of the stub
+    BENCH_DATASET          JSON file {"messages": [...], "queries": [...]} to use instead
+"""
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+CONCURRENCY = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+REQUESTS_PER_OPERATION = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+OUTPUT = sys.argv[3] if len(sys.argv) > 3 else f"benchmark-{datetime.now():%Y%m%d-%H%M%S}.json"
+
+BASE_URL = os.getenv("BENCH_URL")
+OPERATIONS = os.getenv("BENCH_OPERATIONS", "add,search,get_all,admin_scroll").split(",")
+USERS = int(os.getenv("BENCH_USERS", 8))
+LLM_LATENCY_MS = os.getenv("BENCH_LLM_LATENCY_MS", "200")
+LLM_CASSETTE = os.getenv("BENCH_LLM_CASSETTE")
+LLM_JITTER_MS = float(os.getenv("BENCH_LLM_JITTER_MS", 50))
+QDRANT = os.getenv("BENCH_QDRANT", ":memory:")
+REAL_EMBEDDER = os.getenv("BENCH_REAL_EMBEDDER", "false").lower() == "true"
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Conversations in the style of TEST_SCENARIOS.txt
+MESSAGES = [
+    "สวัสดีครับ ผมชื่อปอน อายุ 25 ปี ทำงานเป็น Software Developer ที่บริษัท TechCorp",
+    "ผมชอบเขียน Python และ TypeScript",
+    "อาหารที่ชอบคือ Pizza, Sushi และก๋วยเตี๋ยวเรือ ไม่ชอบผักบุ้งและคื่นฉ่าย",
+    "ในเวลาว่างผมชอบดู F1 เชียร์ทีม Red Bull Racing นักแข่งที่ชื่นชอบคือ Max Verstappen",
+    "นอกจากนี้ก็ชอบเล่นเกม และอ่านหนังสือเกี่ยวกับ AI",
+    "ฉันไปวิ่งที่สวนลุมทุกเช้า และดื่มกาแฟดำทุกวัน",
+    "ผมแพ้กุ้ง ห้ามกินอาหารทะเล",
+    "ฉันอยากไปเที่ยวญี่ปุ่นปีหน้า กำลังเรียนภาษาญี่ปุ่นอยู่",
+    "My name is Pond and I work as a software developer at TechCorp.",
+    "I love pizza and sushi, but I really dislike celery.",
+    "I follow Formula 1 and my favourite driver is Max Verstappen.",
+    "I drive a white Honda Civic and live in Bangkok.",
+    "My cat is called Mango. She is three years old.",
+    "I am allergic to shrimp.",
+    "I go running in Lumpini Park every morning before work.",
+    "I'm planning a trip to Japan next spring to see the cherry blossoms.",
+]
+QUERIES = [
+    "ผมชื่ออะไร และทำงานที่ไหน",
+    "ผมชอบกินอะไรบ้าง",
+    "งานอดิเรกของผมคืออะไร",
+    "ผมแพ้อะไร",
+    "What is my name?",
+    "What food do I like?",
+    "Who is my favourite driver?",
+    "Where do I live?",
+    "What is my pet called?",
+    "Where am I travelling next year?",
+]
+
+
+def load_dataset():
+    path = os.getenv("BENCH_DATASET")
+    if not path:
+        return MESSAGES, QUERIES
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return data.get("messages") or MESSAGES, data.get("queries") or QUERIES
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_ready(url: str, timeout: float = 600.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url, timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{url} not ready after {timeout:.0f}s")
+
+
+def start_stand_ins():
+    """Start the LLM stub and the API on free ports; return (base_url, processes)"""
+    stub_port, api_port = free_port(), free_port()
+    stub_url = f"http://127.0.0.1:{stub_port}/v1"
+    stub_env = {**os.environ, "LLM_STUB_PORT": str(stub_port),
+                "LLM_STUB_LATENCY_MS": LLM_LATENCY_MS, "LLM_STUB_JITTER_MS": str(LLM_JITTER_MS)}
+    if LLM_CASSETTE:
+        stub_env.update({"LLM_STUB_MODE": "replay", "LLM_STUB_CASSETTE": os.path.abspath(LLM_CASSETTE)})
+    stub = subprocess.Popen([sys.executable, "llm_stub.py"], cwd=APP_DIR, env=stub_env)
+    wait_until_ready(f"http://127.0.0.1:{stub_port}/health", timeout=60)
+
+    env = {
+        **os.environ,
+        "API_PORT": str(api_port),
+        "API_WORKERS": "1",
+        "LLM_BASE_URL": stub_url,
+        "LLM_API_KEY": "stub",
+        "QDRANT_COLLECTION": f"bench_{int(time.time())}",
+        "GRAPH_ENABLED": "false",
+        "TAG_CACHE_PATH": "",
+        "LOG_LEVEL": os.getenv("LOG_LEVEL", "WARNING"),
+    }
+    if QDRANT != "server":
+        env["QDRANT_PATH"] = QDRANT
+    if not REAL_EMBEDDER:
+        env["EMBEDDING_SERVER_URL"] = stub_url
+    api = subprocess.Popen([sys.executable, "main.py"], cwd=APP_DIR, env=env)
+    base_url = f"http://127.0.0.1:{api_port}"
+    print(f"⏳ Waiting for the API on {base_url} (stub LLM {LLM_LATENCY_MS}ms)...")
+    wait_until_ready(f"{base_url}/ready")
+    return base_url, [api, stub]
+
+
+def build_request(operation: str, i: int, messages, queries):
+    """(method, path, kwargs) of the i-th request of an operation"""
+    user_id = f"bench_user_{i % USERS}"
+    if operation == "add":
+        text = messages[i % len(messages)]
+        return "POST", "/memory/add", {"json": {"messages": text, "user_id": user_id, "run_id": f"bench_run_{i}"}}
+    if operation == "search":
+        return "POST", "/memory/search", {"json": {"query": queries[i % len(queries)], "user_id": user_id, "limit": 5}}
+    if operation == "get_all":
+        return "GET", "/memory/all", {"params": {"user_id": user_id, "limit": 50}}
+    if operation == "admin_scroll":
+        params = {"limit": 100} if i % 2 else {"limit": 100, "user_id": user_id}
+        return "GET", "/admin/memories", {"params": params}
+    raise ValueError(f"Unknown operation: {operation}")
+
+
+def parse_server_timing(header: str) -> dict:
+    stages = {}
+    for part in filter(None, (p.strip() for p in (header or "").split(","))):
+        name, _, rest = part.partition(";")
+        if rest.startswith("dur="):
+            stages[name] = float(rest[4:])
+    return stages
+
+
+def percentiles(values) -> dict:
+    if not values:
+        return {}
+    values = sorted(values)
+
+    def rank(p):
+        return round(values[min(len(values) - 1, max(0, int(round(p / 100 * len(values))) - 1))], 1)
+
+    return {"p50": rank(50), "p95": rank(95), "p99": rank(99),
+            "mean": round(statistics.fmean(values), 1), "max": round(values[-1], 1)}
+
+
+def run_operation(base_url: str, operation: str, messages, queries) -> dict:
+    latencies, stage_times = [], {}
+    errors = {}
+    lock = threading.Lock()
+    local = threading.local()
+
+    def one(i):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        method, path, kwargs = build_request(operation, i, messages, queries)
+        start = time.perf_counter()
+        try:
+            response = session.request(method, base_url + path, timeout=300, **kwargs)
+            status = response.status_code
+        except requests.RequestException as e:
+            response, status = None, type(e).__name__
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        with lock:
+            if status != 200:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+                return
+            latencies.append(elapsed_ms)
+            for name, ms in parse_server_timing(response.headers.get("Server-Timing")).items():
+                stage_times.setdefault(name, []).append(ms)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        list(pool.map(one, range(REQUESTS_PER_OPERATION)))
+    duration = time.perf_counter() - started
+
+    return {
+        "requests": REQUESTS_PER_OPERATION,
+        "ok": len(latencies),
+        "errors": errors,
+        "duration_s": round(duration, 2),
+        "throughput_rps": round(len(latencies) / duration, 2) if duration else 0.0,
+        "latency_ms": percentiles(latencies),
+        "stages_ms": {name: percentiles(times) for name, times in sorted(stage_times.items())},
+    }
+
+
+def run_benchmark():
+    messages, queries = load_dataset()
+    processes = []
+    base_url = BASE_URL
+    if not base_url:
+        base_url, processes = start_stand_ins()
+    try:
+        report = {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "config": {
+                "base_url": base_url,
+                "stand_ins": not BASE_URL,
+                "concurrency": CONCURRENCY,
+                "requests_per_operation": REQUESTS_PER_OPERATION,
+                "users": USERS,
+                "llm_latency_ms": LLM_LATENCY_MS if not BASE_URL else None,
+                "llm_cassette": LLM_CASSETTE if not BASE_URL else None,
+                "qdrant": QDRANT if not BASE_URL else None,
+                "real_embedder": REAL_EMBEDDER,
+            },
+            "operations": {},
+        }
+        print(f"🏁 {', '.join(OPERATIONS)}: {REQUESTS_PER_OPERATION} requests each at concurrency {CONCURRENCY}")
+        for operation in OPERATIONS:
+            result = run_operation(base_url, operation, messages, queries)
+            report["operations"][operation] = result
+            latency = result["latency_ms"]
+            print(f"   {operation:<13} {result['throughput_rps']:>8.1f} req/s   "
+                  f"p50 {latency.get('p50', 0):>7.1f}  p95 {latency.get('p95', 0):>7.1f}  "
+                  f"p99 {latency.get('p99', 0):>7.1f} ms   errors {sum(result['errors'].values())}")
+        try:
+            report["server_stats"] = requests.get(f"{base_url}/admin/stats", timeout=10).json().get("data")
+        except (requests.RequestException, ValueError):
+            pass
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=30)
+
+    with open(OUTPUT, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"📄 Report written to {OUTPUT}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
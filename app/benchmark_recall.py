@@ -0,0 +1,115 @@
+"""
+Recall benchmark for reduced-dimension embeddings
+
+Embeds a corpus once at full size, then compares exact top-k neighbours of
+each query at reduced sizes (truncation and PCA) against the full-size
+baseline. PCA is fitted on the corpus without the query texts.
+
+The corpus is the memory texts of a Qdrant collection (or built-in
+Thai/English samples when it is empty / unreachable).
+
+Usage:
+    python benchmark_recall.py [dims,...] [k] [collection]
+    python benchmark_recall.py 256,512 10 mem0
+"""
+import os
+import sys
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+from sentence_transformers import SentenceTransformer
+
+from dim_reduction import PcaReducer, TruncateReducer, load_collection_texts
+
+load_dotenv()
+
+DIMS = [int(d) for d in sys.argv[1].split(",")] if len(sys.argv) > 1 else [256, 512]
+TOP_K = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+COLLECTION = sys.argv[3] if len(sys.argv) > 3 else os.getenv("QDRANT_COLLECTION", "mem0")
+MAX_TEXTS = int(os.getenv("RECALL_MAX_TEXTS", 20000))
+NUM_QUERIES = int(os.getenv("RECALL_QUERIES", 200))
+
+FALLBACK_TEXTS = [
+    "ผมชอบกินส้มตำและไก่ย่าง", "I love eating som tam and grilled chicken",
+    "ฉันทำงานเป็นวิศวกรซอฟต์แวร์ที่กรุงเทพ", "I work as a software engineer in Bangkok",
+    "สัตว์เลี้ยงของฉันชื่อมะม่วง เป็นแมว", "My cat is called Mango",
+    "ผมชอบเขียนโปรแกรมด้วย Python", "Python is my favourite programming language",
+    "ฉันไปวิ่งที่สวนลุมทุกเช้า", "I go running in Lumpini Park every morning",
+    "ผมแพ้กุ้ง", "I am allergic to shrimp",
+    "ฉันกำลังเรียนภาษาญี่ปุ่น", "I am learning Japanese",
+    "วันเกิดของผมคือวันที่ 12 มีนาคม", "My birthday is on March 12th",
+    "ฉันชอบดูหนังสยองขวัญ", "I enjoy watching horror movies",
+    "ผมขับรถ Honda Civic สีขาว", "I drive a white Honda Civic",
+    "ฉันดื่มกาแฟดำทุกวัน", "I drink black coffee every day",
+    "ผมอยากไปเที่ยวญี่ปุ่นปีหน้า", "I want to travel to Japan next year",
+]
+
+
+def load_corpus():
+    try:
+        texts = load_collection_texts(COLLECTION, MAX_TEXTS)
+    except Exception as e:
+        print(f"⚠️  Could not read collection '{COLLECTION}': {e}")
+        texts = []
+    if len(texts) < 2 * TOP_K:
+        print(f"ℹ️  Using {len(FALLBACK_TEXTS)} built-in sample texts")
+        return FALLBACK_TEXTS
+    return texts
+
+
+def top_k(queries: np.ndarray, corpus: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ corpus.T
+    k = min(k, corpus.shape[0])
+    idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return idx
+
+
+def recall(baseline: np.ndarray, candidate: np.ndarray) -> float:
+    hits = [len(set(b) & set(c)) / len(b) for b, c in zip(baseline, candidate)]
+    return float(np.mean(hits))
+
+
+def run_benchmark():
+    texts = load_corpus()
+    model_name = os.getenv("EMBEDDING_MODEL", "BAAI/bge-m3")
+    print(f"📥 Embedding {len(texts)} texts with {model_name}...")
+    model = SentenceTransformer(model_name)
+    full = model.encode(texts, batch_size=64, normalize_embeddings=True, convert_to_numpy=True)
+    native_dims = full.shape[1]
+
+    rng = np.random.default_rng(0)
+    query_idx = rng.choice(len(texts), size=min(NUM_QUERIES, len(texts) // 2), replace=False)
+    corpus_mask = np.ones(len(texts), dtype=bool)
+    corpus_mask[query_idx] = False
+    queries, corpus = full[query_idx], full[corpus_mask]
+    k = min(TOP_K, corpus.shape[0])
+    baseline = top_k(queries, corpus, k)
+
+    print()
+    print(f"🏁 recall@{k} vs {native_dims}-dim baseline ({len(queries)} queries, {len(corpus)} documents)")
+    print(f"   {'dims':>5}  {'method':<9}  {'recall':>7}  {'bytes/vec':>9}  {'search ms':>9}")
+    start = time.perf_counter()
+    top_k(queries, corpus, k)
+    print(f"   {native_dims:>5}  {'full':<9}  {1.0:>7.3f}  {native_dims * 4:>9}  "
+          f"{(time.perf_counter() - start) * 1000:>9.1f}")
+
+    for dims in DIMS:
+        if dims >= native_dims:
+            continue
+        reducers = [TruncateReducer(dims)]
+        if corpus.shape[0] >= dims:
+            reducers.append(PcaReducer.fit(corpus, dims))
+        else:
+            print(f"   {dims:>5}  {'pca':<9}  skipped (needs >= {dims} documents)")
+        for reducer in reducers:
+            reduced_queries, reduced_corpus = reducer.reduce(queries), reducer.reduce(corpus)
+            start = time.perf_counter()
+            candidate = top_k(reduced_queries, reduced_corpus, k)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"   {dims:>5}  {reducer.method:<9}  {recall(baseline, candidate):>7.3f}  "
+                  f"{dims * 4:>9}  {elapsed:>9.1f}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
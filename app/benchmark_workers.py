@@ -0,0 +1,126 @@
+"""
+Memory vs throughput benchmark for single- and multi-worker deployments
+
+Drives concurrent /memory/search requests against a running API and
+reports throughput together with the memory used by the API workers and
+the shared embedding server (RSS, and PSS so shared pages are counted once).
+Ends with a Markdown table row and the hardware, for the README's
+memory-vs-throughput table.
+
+Usage (run on the host/container where the API processes live):
+    API_WORKERS=4 python benchmark_workers.py [base_url] [concurrency] [duration_seconds]
+"""
+import os
+import sys
+import time
+import statistics
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BASE_URL = sys.argv[1] if len(sys.argv) > 1 else "http://localhost:8000"
+CONCURRENCY = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+DURATION = float(sys.argv[3]) if len(sys.argv) > 3 else 30.0
+
+QUERIES = [
+    "ผมชอบกินอะไร",
+    "What programming languages do I like?",
+    "งานของฉันคืออะไร",
+    "Where do I live?",
+    "สัตว์เลี้ยงของฉันชื่ออะไร",
+    "What are my hobbies?",
+]
+
+
+def process_memory_mb():
+    """Sum RSS and PSS of API worker and embedding server processes (Linux only)"""
+    totals = {"api": 0.0, "embedding_server": 0.0, "api_rss": 0.0, "embedding_server_rss": 0.0}
+    for pid in filter(str.isdigit, os.listdir("/proc")):
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                cmdline = f.read().replace(b"\0", b" ").decode(errors="ignore")
+            if "embedding_server" in cmdline:
+                key = "embedding_server"
+            elif "main.py" in cmdline or "main:app" in cmdline or "multiprocessing" in cmdline:
+                key = "api"
+            else:
+                continue
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                for line in f:
+                    if line.startswith("Pss:"):
+                        totals[key] += int(line.split()[1]) / 1024
+                    elif line.startswith("Rss:"):
+                        totals[f"{key}_rss"] += int(line.split()[1]) / 1024
+        except (OSError, ValueError):
+            continue
+    return {k: round(v, 1) for k, v in totals.items()}
+
+
+def hardware() -> str:
+    cpu = "unknown CPU"
+    memory_gb = 0.0
+    try:
+        with open("/proc/cpuinfo") as f:
+            cpu = next((line.split(":", 1)[1].strip() for line in f if line.startswith("model name")), cpu)
+        with open("/proc/meminfo") as f:
+            memory_gb = int(f.readline().split()[1]) / 1024 / 1024
+    except OSError:
+        pass
+    return f"{cpu}, {os.cpu_count()} cores, {memory_gb:.0f} GB RAM"
+
+
+def run_benchmark():
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    deadline = time.time() + DURATION
+
+    def worker(worker_id):
+        nonlocal errors
+        session = requests.Session()
+        i = worker_id
+        while time.time() < deadline:
+            query = QUERIES[i % len(QUERIES)] + f" #{i}"  # defeat result/embedding caches
+            i += CONCURRENCY
+            start = time.perf_counter()
+            try:
+                response = session.post(
+                    f"{BASE_URL}/memory/search",
+                    json={"query": query, "user_id": f"bench_user_{worker_id % 4}", "limit": 5},
+                    timeout=60,
+                )
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors += 1
+
+    print(f"🏁 {CONCURRENCY} concurrent searches for {DURATION:.0f}s against {BASE_URL}")
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        list(pool.map(worker, range(CONCURRENCY)))
+
+    latencies.sort()
+    memory_mb = process_memory_mb()
+    print()
+    print(f"   Requests:    {len(latencies)} ok, {errors} errors")
+    print(f"   Throughput:  {len(latencies) / DURATION:.1f} req/s")
+    if latencies:
+        print(f"   p50 latency: {statistics.median(latencies) * 1000:.0f} ms")
+        print(f"   p95 latency: {latencies[int(len(latencies) * 0.95) - 1] * 1000:.0f} ms")
+    print(f"   Memory RSS:  API workers {memory_mb['api_rss']} MB, embedding server {memory_mb['embedding_server_rss']} MB")
+    print(f"   Memory PSS:  API workers {memory_mb['api']} MB, embedding server {memory_mb['embedding_server']} MB")
+    print()
+    print(f"   Hardware:    {hardware()}")
+    print("   | Workers | API RSS (MB) | Embedding server RSS (MB) | Total PSS (MB) | req/s | p95 (ms) |")
+    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0.0
+    print(f"   | {os.getenv('API_WORKERS', '?')} | {memory_mb['api_rss']:.0f} | {memory_mb['embedding_server_rss']:.0f} | "
+          f"{memory_mb['api'] + memory_mb['embedding_server']:.0f} | {len(latencies) / DURATION:.1f} | {p95:.0f} |")
+
+
+if __name__ == "__main__":
+    run_benchmark()
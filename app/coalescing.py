@@ -0,0 +1,232 @@
+"""
+Write coalescing for rapid successive adds to one conversation.
+
+Dify calls /memory/add after nearly every turn, and each call runs Mem0's
+whole extract-compare-update cycle. ``AddCoalescer`` buffers adds per
+conversation and hands them to ``flush(key, items)`` together - as one
+combined ``memory.add`` and one tagging call - once the conversation has
+been quiet for ``window`` seconds, has ``max_messages`` buffered, or the
+oldest buffered add is ``max_delay`` seconds old.
+
+Buffered adds live in memory only: a crash loses them, so ``stop`` flushes
+everything on shutdown. The caller has already been told its add is
+buffered, so a failed flush is not dropped: the items go to ``fallback``
+(the durable ingest queue) when one is set, and are otherwise buffered
+again and retried with backoff up to ``max_retries`` times.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _Buffer:
+    def __init__(self):
+        self.items: List = []
+        self.first_at = time.monotonic()
+        self.last_at = self.first_at
+        self.attempts = 0  # Failed flushes of the items at the head of the buffer
+        self.retry_at = 0.0
+
+
+class AddCoalescer:
+    """Per-conversation add buffers flushed by a timer thread"""
+
+    def __init__(
+        self,
+        flush: Callable[[Hashable, List], object],
+        window: float = 5.0,
+        max_messages: int = 8,
+        max_delay: float = 30.0,
+        num_workers: int = 2,
+        max_retries: int = 3,
+        retry_delay: float = 5.0,
+        fallback: Optional[Callable[[Hashable, List], object]] = None,
+    ):
+        self.flush_fn = flush
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.fallback = fallback
+        self.window = window
+        self.max_messages = max_messages
+        self.max_delay = max_delay
+        self.num_workers = num_workers
+        self._lock = threading.Condition()
+        self._buffers: Dict[Hashable, _Buffer] = {}
+        self._key_locks: Dict[Hashable, list] = {}  # key -> [lock, users]
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self.submitted = 0
+        self.flushes = 0
+        self.flushed_items = 0
+        self.failed_flushes = 0
+        self.retried_flushes = 0
+        self.handed_off = 0
+        self.dropped_items = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+        self._stopping = False
+        self._executor = ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix="coalesce-flush")
+        self._thread = threading.Thread(target=self._run, name="add-coalescer", daemon=True)
+        self._thread.start()
+        logger.info(f"🧺 Add coalescing on ({self.window:.1f}s window, up to {self.max_messages} messages)")
+
+    def stop(self, timeout: float = 30.0):
+        """Flush every buffer and stop the timer thread"""
+        if self._thread is None:
+            return
+        with self._lock:
+            self._stopping = True
+            self._lock.notify_all()
+        self._thread.join(timeout=timeout)
+        self._thread = None
+        self.flush_all()
+        self._executor.shutdown(wait=True)
+        self._executor = None
+
+    def submit(self, key: Hashable, item) -> int:
+        """Buffer ``item`` for ``key``; return how many adds are now buffered for it"""
+        with self._lock:
+            buffer = self._buffers.get(key)
+            if buffer is None:
+                buffer = self._buffers[key] = _Buffer()
+            buffer.items.append(item)
+            buffer.last_at = time.monotonic()
+            self.submitted += 1
+            count = len(buffer.items)
+            if count >= self.max_messages and time.monotonic() >= buffer.retry_at:
+                self._dispatch(key)
+            else:
+                self._lock.notify_all()
+            return count
+
+    def pending(self, key: Hashable = None) -> int:
+        with self._lock:
+            if key is not None:
+                return len(self._buffers[key].items) if key in self._buffers else 0
+            return sum(len(buffer.items) for buffer in self._buffers.values())
+
+    def flush(self, key: Hashable):
+        """Flush one buffer now, on the calling thread; return the flush result (None if empty)"""
+        with self._lock:
+            buffer = self._buffers.pop(key, None)
+        if buffer is None:
+            return None
+        return self._flush(key, buffer.items, buffer.attempts)
+
+    def flush_matching(self, predicate: Callable[[Hashable], bool]) -> Dict[Hashable, object]:
+        """Flush every buffer whose key matches, on the calling thread"""
+        with self._lock:
+            keys = [key for key in self._buffers if predicate(key)]
+        results = {}
+        for key in keys:
+            try:
+                results[key] = self.flush(key)
+            except Exception as e:
+                results[key] = e
+        return results
+
+    def flush_all(self) -> Dict[Hashable, object]:
+        return self.flush_matching(lambda key: True)
+
+    def _dispatch(self, key: Hashable):
+        # Caller holds self._lock
+        buffer = self._buffers.pop(key, None)
+        if buffer is not None and self._executor is not None:
+            self._executor.submit(self._flush_quietly, key, buffer.items, buffer.attempts)
+
+    def _flush(self, key: Hashable, items: List, attempts: int = 0):
+        # One flush per conversation at a time, so Mem0 sees its adds in order
+        with self._lock:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                try:
+                    result = self.flush_fn(key, items)
+                except Exception as e:
+                    self.failed_flushes += 1
+                    self._recover(key, items, attempts + 1, e)
+                    raise
+                self.flushes += 1
+                self.flushed_items += len(items)
+                return result
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    self._key_locks.pop(key, None)
+
+    def _flush_quietly(self, key: Hashable, items: List, attempts: int = 0):
+        try:
+            self._flush(key, items, attempts)
+        except Exception:
+            pass  # Recovered (or counted as dropped) in _flush
+
+    def _recover(self, key: Hashable, items: List, attempts: int, error: Exception):
+        """Keep acknowledged adds whose flush failed: hand them off, or buffer them again"""
+        if self.fallback is not None:
+            try:
+                self.fallback(key, items)
+                self.handed_off += len(items)
+                logger.warning(f"⚠️  Coalesced add failed, {len(items)} messages handed to the ingest queue: {error}",
+                               extra={"key": str(key)})
+                return
+            except Exception as e:
+                logger.exception(f"❌ Coalesced add hand-off failed: {e}", extra={"key": str(key)})
+        with self._lock:
+            if attempts <= self.max_retries and not self._stopping:
+                buffer = self._buffers.get(key)
+                if buffer is None:
+                    buffer = self._buffers[key] = _Buffer()
+                buffer.items[:0] = items
+                buffer.attempts = max(buffer.attempts, attempts)
+                delay = min(self.retry_delay * 2 ** (attempts - 1), self.max_delay)
+                buffer.retry_at = time.monotonic() + delay
+                self.retried_flushes += 1
+                self._lock.notify_all()
+                logger.warning(f"⚠️  Coalesced add failed (attempt {attempts}), retrying in {delay:.0f}s: {error}",
+                               extra={"key": str(key)})
+                return
+            self.dropped_items += len(items)
+        logger.error(f"❌ Coalesced add failed after {attempts} attempts ({len(items)} messages dropped): {error}",
+                     extra={"key": str(key)})
+
+    def _due_at(self, buffer: _Buffer) -> float:
+        return max(min(buffer.last_at + self.window, buffer.first_at + self.max_delay), buffer.retry_at)
+
+    def _run(self):
+        with self._lock:
+            while not self._stopping:
+                now = time.monotonic()
+                for key in [k for k, b in self._buffers.items() if self._due_at(b) <= now]:
+                    self._dispatch(key)
+                next_due = min((self._due_at(b) for b in self._buffers.values()), default=None)
+                self._lock.wait(None if next_due is None else max(0.0, next_due - now))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "window": self.window,
+                "max_messages": self.max_messages,
+                "conversations": len(self._buffers),
+                "pending": sum(len(buffer.items) for buffer in self._buffers.values()),
+                "submitted": self.submitted,
+                "flushes": self.flushes,
+                "flushed_items": self.flushed_items,
+                "failed_flushes": self.failed_flushes,
+                "retried_flushes": self.retried_flushes,
+                "handed_off": self.handed_off,
+                "dropped_items": self.dropped_items,
+            }
@@ -0,0 +1,150 @@
+"""
+Reduced-dimension embeddings (EMBEDDING_DIMS < the model's native size).
+
+Two reducers:
+- ``truncate``: keep the first N components and re-normalise (Matryoshka
+  style; works best with models trained for it).
+- ``pca``: project onto the top N principal components of a sample of
+  stored memories. The projection is fitted once and saved next to the
+  collection's data as ``<PCA_DIR>/<collection>_<dims>.npz``.
+
+Fit the PCA projection for QDRANT_COLLECTION by re-embedding texts stored
+in a source collection (default: the full-size ``mem0`` collection):
+    python dim_reduction.py fit [dims] [source_collection]
+"""
+import os
+import sys
+from typing import List, Optional
+
+import numpy as np
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+class TruncateReducer:
+    """Keep the leading ``dims`` components and re-normalise"""
+
+    method = "truncate"
+
+    def __init__(self, dims: int):
+        self.dims = dims
+
+    def reduce(self, vectors: np.ndarray) -> np.ndarray:
+        return _normalize(np.asarray(vectors, dtype=np.float32)[..., :self.dims])
+
+
+class PcaReducer:
+    """Project onto fitted principal components and re-normalise"""
+
+    method = "pca"
+
+    def __init__(self, mean: np.ndarray, components: np.ndarray):
+        self.mean = mean.astype(np.float32)
+        self.components = components.astype(np.float32)  # (dims, native_dims)
+        self.dims = components.shape[0]
+
+    @classmethod
+    def fit(cls, vectors: np.ndarray, dims: int) -> "PcaReducer":
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(vectors) < dims:
+            raise ValueError(f"PCA to {dims} dims needs at least {dims} sample vectors, got {len(vectors)}")
+        mean = vectors.mean(axis=0)
+        _, _, vt = np.linalg.svd(vectors - mean, full_matrices=False)
+        return cls(mean, vt[:dims])
+
+    @classmethod
+    def load(cls, path: str) -> "PcaReducer":
+        data = np.load(path)
+        return cls(data["mean"], data["components"])
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(path, mean=self.mean, components=self.components)
+
+    def reduce(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        return _normalize((vectors - self.mean) @ self.components.T)
+
+
+def pca_path(collection: str, dims: int) -> str:
+    return os.path.join(os.getenv("PCA_DIR", "/data/pca"), f"{collection}_{dims}.npz")
+
+
+def reducer_from_env(collection: str, native_dims: int):
+    """Build the configured reducer, or None when vectors are stored at full size"""
+    dims = int(os.getenv("EMBEDDING_DIMS", native_dims))
+    if dims >= native_dims:
+        return None
+    method = os.getenv("EMBEDDING_REDUCTION", "truncate").lower()
+    if method == "truncate":
+        return TruncateReducer(dims)
+    if method == "pca":
+        path = pca_path(collection, dims)
+        if not os.path.exists(path):
+            raise RuntimeError(f"EMBEDDING_REDUCTION=pca needs a fitted projection at {path} "
+                               f"(run: python dim_reduction.py fit {dims})")
+        return PcaReducer.load(path)
+    raise ValueError(f"EMBEDDING_REDUCTION must be truncate or pca, got '{method}'")
+
+
+def install_reducer(embedder, reducer):
+    """Reduce every vector a Mem0 embedder returns (``embed`` and ``embed_texts``)"""
+    embed = embedder.embed
+
+    def reduced_embed(text, memory_action=None):
+        return reducer.reduce(embed(text, memory_action)).tolist()
+
+    embedder.embed = reduced_embed
+    embedder.reducer = reducer
+
+
+def reduce_vectors(embedder, vectors: List[List[float]]) -> List[List[float]]:
+    """Apply the embedder's reducer (if any) to full-size vectors"""
+    reducer = getattr(embedder, "reducer", None)
+    if reducer is None or not vectors:
+        return vectors
+    return reducer.reduce(np.asarray(vectors, dtype=np.float32)).tolist()
+
+
+def load_collection_texts(collection: str, limit: Optional[int] = None) -> List[str]:
+    """Scroll memory texts (payload ``data``) out of a Qdrant collection"""
+    from qdrant_client import QdrantClient
+
+    client = QdrantClient(host=os.getenv("QDRANT_HOST", "localhost"), port=int(os.getenv("QDRANT_PORT", 6333)))
+    texts, offset = [], None
+    while limit is None or len(texts) < limit:
+        points, offset = client.scroll(
+            collection_name=collection, limit=500, offset=offset, with_payload=["data"], with_vectors=False,
+        )
+        texts.extend(p.payload["data"] for p in points if (p.payload or {}).get("data"))
+        if offset is None:
+            break
+    return texts[:limit] if limit else texts
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from sentence_transformers import SentenceTransformer
+
+    load_dotenv()
+    if len(sys.argv) < 2 or sys.argv[1] != "fit":
+        print(__doc__)
+        sys.exit(1)
+    target_dims = int(sys.argv[2]) if len(sys.argv) > 2 else int(os.getenv("EMBEDDING_DIMS", 256))
+    collection_name = os.getenv("QDRANT_COLLECTION", "mem0")
+    source_collection = sys.argv[3] if len(sys.argv) > 3 else "mem0"
+    sample_size = int(os.getenv("PCA_SAMPLE_SIZE", 20000))
+
+    print(f"📥 Loading up to {sample_size} memories from '{source_collection}'...")
+    sample = load_collection_texts(source_collection, sample_size)
+    print(f"📥 Embedding {len(sample)} texts with {os.getenv('EMBEDDING_MODEL', 'BAAI/bge-m3')}...")
+    model = SentenceTransformer(os.getenv("EMBEDDING_MODEL", "BAAI/bge-m3"))
+    full = model.encode(sample, batch_size=64, normalize_embeddings=True, convert_to_numpy=True)
+
+    reducer = PcaReducer.fit(full, target_dims)
+    output = pca_path(collection_name, target_dims)
+    reducer.save(output)
+    print(f"✅ Saved {full.shape[1]} -> {target_dims} PCA projection to {output}")
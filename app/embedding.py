@@ -0,0 +1,148 @@
+"""
+Embedding helpers shared by the API endpoints.
+
+``EmbeddingBatcher`` is a small in-process embedding service: concurrent
+embed calls from add and search are queued and grouped into micro-batches
+so one ``encode`` forward pass serves many requests.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List
+
+from dim_reduction import reduce_vectors
+from executors import backends
+from request_log import stage
+
+
+class EmbeddingBatcher:
+    """Collect concurrent embed requests into micro-batches"""
+
+    def __init__(self, model, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = None
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def embed(self, text: str) -> List[float]:
+        return self.embed_many([text])[0]
+
+    def embed_many(self, texts: List[str]) -> List[List[float]]:
+        self.start()
+        # Encoding happens on the batcher thread; time the wait here, for the request
+        with stage("embed", "batched"):
+            futures = []
+            for text in texts:
+                future = Future()
+                self._queue.put((text, future))
+                futures.append(future)
+            return [future.result() for future in futures]
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+            self._encode(batch)
+
+    def _encode(self, batch: list):
+        texts = [text for text, _ in batch]
+        try:
+            with backends["embedder"].slot("encode_batch"):
+                vectors = self.model.encode(texts, batch_size=len(texts), convert_to_numpy=True)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.items += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        for (_, future), vector in zip(batch, vectors):
+            future.set_result(vector.tolist())
+
+    def stats(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": self._queue.qsize(),
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+        }
+
+
+def install_batcher(embedder, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+    """Route a Mem0 embedder's ``embed`` calls through an EmbeddingBatcher.
+
+    Only embedders that wrap a SentenceTransformer (``.model.encode``) can
+    be batched; returns None and leaves others untouched.
+    """
+    model = getattr(embedder, "model", None)
+    if not hasattr(model, "encode"):
+        return None
+    batcher = EmbeddingBatcher(model, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
+    def batched_embed(text, memory_action=None):
+        return batcher.embed(text)
+
+    embedder.embed = batched_embed
+    embedder.batcher = batcher
+    return batcher
+
+
+def embed_texts(embedder, texts: List[str], memory_action: str = "add") -> List[List[float]]:
+    """Embed many texts at once.
+
+    Uses the embedder's batcher when one is installed, a single batched
+    ``encode`` call when the embedder wraps a SentenceTransformer, one
+    request for OpenAI-compatible embedders, and otherwise one ``embed``
+    call per text. Vectors come back reduced when EMBEDDING_DIMS is set.
+    """
+    if not texts:
+        return []
+    batcher = getattr(embedder, "batcher", None)
+    if batcher is not None:
+        return reduce_vectors(embedder, batcher.embed_many(texts))
+    model = getattr(embedder, "model", None)
+    if hasattr(model, "encode"):
+        with backends["embedder"].slot("encode"):
+            vectors = model.encode(texts, convert_to_numpy=True)
+        return reduce_vectors(embedder, [vector.tolist() for vector in vectors])
+    client = getattr(embedder, "client", None)
+    model_name = getattr(getattr(embedder, "config", None), "model", None)
+    if hasattr(client, "embeddings") and model_name:
+        # OpenAI-compatible embedder (e.g. the shared embedding server): one request
+        with backends["embedder"].slot("embeddings"):
+            response = client.embeddings.create(input=texts, model=model_name)
+        vectors = [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+        return reduce_vectors(embedder, vectors)
+    return [embedder.embed(text, memory_action) for text in texts]  # already reduced
@@ -0,0 +1,97 @@
+"""
+In-process cache for query embeddings.
+
+Vectors are stored as float32 rows in one preallocated numpy arena sized
+from a memory budget, with an LRU index from key to row. Keys combine the
+embedding model name with the normalised query text.
+"""
+import hashlib
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+
+
+def normalize_query(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text or "")
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class EmbeddingCache:
+    """LRU of float32 vectors bounded by ``max_bytes``"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._arena: Optional[np.ndarray] = None
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._free: List[int] = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        return hashlib.sha1(f"{model}\0{normalize_query(text)}".encode("utf-8")).hexdigest()
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        key = self.make_key(model, text)
+        with self._lock:
+            row = self._index.get(key)
+            if row is None:
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+            self.hits += 1
+            return self._arena[row].tolist()
+
+    def put(self, model: str, text: str, vector: List[float]):
+        vector = np.asarray(vector, dtype=np.float32)
+        key = self.make_key(model, text)
+        with self._lock:
+            if self._arena is None:
+                # Size the arena on first use, once the dimension is known
+                capacity = max(1, self.max_bytes // (vector.shape[0] * 4))
+                self._arena = np.zeros((capacity, vector.shape[0]), dtype=np.float32)
+                self._free = list(range(capacity - 1, -1, -1))
+            if vector.shape[0] != self._arena.shape[1]:
+                return
+            row = self._index.get(key)
+            if row is None:
+                if not self._free:
+                    _, evicted = self._index.popitem(last=False)
+                    self._free.append(evicted)
+                    self.evictions += 1
+                row = self._free.pop()
+            self._arena[row] = vector
+            self._index[key] = row
+            self._index.move_to_end(key)
+
+    def wrap(self, embed_fn, model: str, actions=("search",)):
+        """Wrap a Mem0 ``embed(text, memory_action)`` with this cache"""
+        def cached_embed(text, memory_action=None):
+            if memory_action not in actions or not isinstance(text, str):
+                return embed_fn(text, memory_action)
+            vector = self.get(model, text)
+            if vector is None:
+                vector = embed_fn(text, memory_action)
+                self.put(model, text, vector)
+            return vector
+
+        return cached_embed
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._index),
+            "capacity": 0 if self._arena is None else self._arena.shape[0],
+            "bytes": 0 if self._arena is None else self._arena.nbytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
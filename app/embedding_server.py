@@ -0,0 +1,80 @@
+"""
+Shared embedding server.
+
+Loads the SentenceTransformer model once and serves it over an
+OpenAI-compatible ``POST /v1/embeddings`` endpoint, so any number of API
+workers can share one copy of bge-m3 instead of loading 2+ GB each.
+Requests from all workers are micro-batched together.
+
+Run:
+    python embedding_server.py            # listens on EMBEDDING_SERVER_PORT (8001)
+
+Then start the API with EMBEDDING_SERVER_URL=http://localhost:8001/v1 and
+API_WORKERS=N.
+"""
+import asyncio
+import logging
+import os
+from typing import List, Optional, Union
+
+import uvicorn
+from dotenv import load_dotenv
+from fastapi import FastAPI
+from pydantic import BaseModel
+from sentence_transformers import SentenceTransformer
+
+from embedding import EmbeddingBatcher
+from onnx_embedder import onnx_embedder_from_env
+from request_log import setup_logging
+
+load_dotenv()
+setup_logging()
+logger = logging.getLogger("embedding_server")
+
+MODEL_NAME = os.getenv("EMBEDDING_MODEL", "BAAI/bge-m3")
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "huggingface")
+
+app = FastAPI(title="Mem0 Embedding Server", description="Shared embedding model for API workers")
+
+logger.info(f"📥 Loading embedding model {MODEL_NAME}...")
+model = onnx_embedder_from_env() if EMBEDDING_PROVIDER == "onnx" else SentenceTransformer(MODEL_NAME)
+batcher = EmbeddingBatcher(
+    model,
+    max_batch_size=int(os.getenv("EMBED_BATCH_SIZE", 32)),
+    max_wait_ms=float(os.getenv("EMBED_BATCH_WAIT_MS", 5)),
+)
+logger.info("✅ Embedding model loaded")
+
+
+class EmbeddingRequest(BaseModel):
+    input: Union[str, List[str]]
+    model: Optional[str] = None
+    dimensions: Optional[int] = None  # Accepted for OpenAI compatibility, ignored
+    encoding_format: Optional[str] = None
+
+
+@app.post("/v1/embeddings")
+async def create_embeddings(request: EmbeddingRequest):
+    """OpenAI-compatible embeddings endpoint"""
+    texts = [request.input] if isinstance(request.input, str) else request.input
+    loop = asyncio.get_running_loop()
+    vectors = await loop.run_in_executor(None, batcher.embed_many, texts)
+    return {
+        "object": "list",
+        "model": MODEL_NAME,
+        "data": [
+            {"object": "embedding", "index": i, "embedding": vector}
+            for i, vector in enumerate(vectors)
+        ],
+        "usage": {"prompt_tokens": 0, "total_tokens": 0},
+    }
+
+
+@app.get("/health")
+def health_check():
+    """Health check endpoint"""
+    return {"status": "healthy", "model": MODEL_NAME, "batcher": batcher.stats()}
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("EMBEDDING_SERVER_PORT", 8001)))
@@ -5,12 +5,19 @@ import os
 from dotenv import load_dotenv
 from mem0 import Memory
 
+from dim_reduction import reducer_from_env, install_reducer
+
 # Load environment variables
 load_dotenv()
 
 # Configure Mem0 with Custom LLM and Local Embeddings
 embedding_provider = os.getenv("EMBEDDING_PROVIDER", "huggingface")
 
+# bge-m3 is 1024-dim; EMBEDDING_DIMS below that stores reduced vectors
+native_dims = int(os.getenv("EMBEDDING_MODEL_DIMS", 1024))
+reducer = reducer_from_env(os.getenv("QDRANT_COLLECTION", "mem0"), native_dims)
+embedding_dims = reducer.dims if reducer is not None else native_dims
+
 config = {
     "llm": {
         "provider": "openai",
@@ -31,13 +38,16 @@ config = {
         "config": {
             "host": os.getenv("QDRANT_HOST", "localhost"),
             "port": int(os.getenv("QDRANT_PORT", 6333)),
-            "embedding_model_dims": 1024,  # bge-m3 dimension - FIXED to 1024
+            "collection_name": os.getenv("QDRANT_COLLECTION", "mem0"),
+            "embedding_model_dims": embedding_dims,
         }
     },
 }
 
 # Initialize Memory
 m = Memory.from_config(config)
+if reducer is not None:
+    install_reducer(m.embedding_model, reducer)
 
 def example_user_memory():
     """Example: Store and retrieve user preferences"""
@@ -0,0 +1,215 @@
+"""
+Bounded concurrency for blocking work.
+
+Two layers keep a slow dependency from starving the others:
+
+* ``RequestPool``  - a bounded thread pool per route class (write / read /
+  admin). Async handlers hand their blocking Mem0 call to one of these, so
+  slow adds cannot take the threads searches need.
+* ``BackendLimiter`` - a concurrency limit per backend (embedder, llm,
+  qdrant, neo4j, reranker). Every call into a backend, including the ones Mem0 makes
+  internally, holds one of its slots.
+
+Both report queue depth so each dependency can be tuned on its own.
+Backend slots also add their time to the current request's stages.
+"""
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from request_log import record_stage
+
+
+class BackendBusy(Exception):
+    """Raised when a pool's wait queue is full"""
+
+
+class BackendLimiter:
+    """Concurrency limit for one backend, shared by all threads"""
+
+    def __init__(self, name: str, max_concurrency: int, stage: str = None):
+        self.name = name
+        self.stage = stage or name  # Request stage the call time is reported under
+        self.max_concurrency = max_concurrency
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.active = 0
+        self.completed = 0
+
+    @contextmanager
+    def slot(self, operation: str = None):
+        """Hold one slot for the duration of a backend call.
+
+        Re-entrant per thread: nested calls into the same backend (e.g. a
+        graph operation calling another graph method) reuse the slot.
+        ``operation`` (search, upsert, ...) labels the call's timing.
+        """
+        depth = getattr(self._local, "depth", 0)
+        if depth:
+            self._local.depth = depth + 1
+            try:
+                yield
+            finally:
+                self._local.depth = depth
+            return
+
+        start = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+        self._semaphore.acquire()
+        with self._lock:
+            self.waiting -= 1
+            self.active += 1
+        self._local.depth = 1
+        try:
+            yield
+        finally:
+            self._local.depth = 0
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+            self._semaphore.release()
+            record_stage(self.stage, (time.perf_counter() - start) * 1000.0, operation)
+
+    def wrap(self, fn):
+        """Return ``fn`` wrapped so every call holds a slot"""
+        if getattr(fn, "_limited_by", None) is self:
+            return fn
+
+        operation = getattr(fn, "__name__", None)
+
+        @functools.wraps(fn)
+        def limited(*args, **kwargs):
+            with self.slot(operation):
+                return fn(*args, **kwargs)
+
+        limited._limited_by = self
+        return limited
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self.active,
+            "queue_depth": self.waiting,
+            "completed": self.completed,
+        }
+
+
+class RequestPool:
+    """Bounded thread pool that async handlers offload blocking work to"""
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-pool")
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, fn, *args, **kwargs):
+        """Run ``fn`` in the pool; raise BackendBusy if the queue is full"""
+        with self._lock:
+            queued = self.submitted - self.running - self.completed
+            if self.max_queue and queued >= self.max_queue:
+                self.rejected += 1
+                raise BackendBusy(f"{self.name} pool queue is full ({queued} waiting)")
+            self.submitted += 1
+        loop = asyncio.get_running_loop()
+        # Run in a copy of the handler's context so request ID and stages follow
+        call = functools.partial(contextvars.copy_context().run, self._call, fn, *args, **kwargs)
+        return await loop.run_in_executor(self._executor, call)
+
+    def _call(self, fn, *args, **kwargs):
+        with self._lock:
+            self.running += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "running": self.running,
+            "queue_depth": self.submitted - self.running - self.completed,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+backends = {
+    "embedder": BackendLimiter("embedder", _env_int("EMBEDDER_CONCURRENCY", 2), stage="embed"),
+    "llm": BackendLimiter("llm", _env_int("LLM_CONCURRENCY", 16), stage="llm"),
+    "qdrant": BackendLimiter("qdrant", _env_int("QDRANT_CONCURRENCY", 16), stage="vector"),
+    "neo4j": BackendLimiter("neo4j", _env_int("NEO4J_CONCURRENCY", 8), stage="graph"),
+    "reranker": BackendLimiter("reranker", _env_int("RERANKER_CONCURRENCY", 1), stage="rerank"),
+}
+
+pools = {
+    "write": RequestPool("write", _env_int("WRITE_POOL_SIZE", 16), _env_int("WRITE_POOL_QUEUE", 200)),
+    "read": RequestPool("read", _env_int("READ_POOL_SIZE", 16), _env_int("READ_POOL_QUEUE", 200)),
+    "admin": RequestPool("admin", _env_int("ADMIN_POOL_SIZE", 4), _env_int("ADMIN_POOL_QUEUE", 50)),
+}
+
+
+def instrument_memory(memory):
+    """Route Mem0's internal backend calls through the backend limiters"""
+    _wrap_methods(getattr(memory, "embedding_model", None), backends["embedder"], ["embed"])
+    _wrap_methods(getattr(memory, "llm", None), backends["llm"], ["generate_response"])
+    _wrap_methods(
+        getattr(memory, "vector_store", None), backends["qdrant"],
+        ["insert", "search", "update", "delete", "get", "list"],
+    )
+    instrument_graph(getattr(memory, "graph", None))
+
+
+def instrument_graph(graph):
+    """Route a Mem0 graph store's Neo4j and LLM calls through the limiters"""
+    if graph is None:
+        return
+    _wrap_methods(graph, backends["neo4j"], ["add", "search", "delete_all", "get_all"])
+    _wrap_methods(getattr(graph, "llm", None), backends["llm"], ["generate_response"])
+    _wrap_methods(getattr(graph, "embedding_model", None), backends["embedder"], ["embed"])
+
+
+def _wrap_methods(owner, limiter, names):
+    if owner is None:
+        return
+    for name in names:
+        method = getattr(owner, name, None)
+        if callable(method):
+            setattr(owner, name, limiter.wrap(method))
+
+
+def instrument_qdrant_client(client):
+    """Route direct QdrantClient calls through the qdrant limiter"""
+    for name in ["scroll", "upsert", "set_payload", "count", "delete", "search", "query_points", "retrieve"]:
+        method = getattr(client, name, None)
+        if callable(method):
+            setattr(client, name, backends["qdrant"].wrap(method))
+
+
+def executor_stats() -> dict:
+    return {
+        "backends": {name: limiter.stats() for name, limiter in backends.items()},
+        "pools": {name: pool.stats() for name, pool in pools.items()},
+    }
@@ -0,0 +1,308 @@
+"""
+Durable ingest queue for /memory/add.
+
+Adds are written to a SQLite write-ahead table and acknowledged with a job
+ID before any backend work happens; a pool of worker threads then runs
+them through the normal add pipeline. Jobs that fail are retried with
+exponential backoff up to ``max_attempts``. Workers wait for ``ready``
+(the vector backend) before claiming jobs, and failures ``transient``
+reports (backend still starting) are retried without using up an attempt.
+
+Several API workers may share the SQLite file: a job is claimed with a
+guarded update and leased to the claiming queue, which renews the lease
+while it runs. Jobs whose lease expired - their process died - are put
+back in the queue, so every add is processed at least once.
+
+Jobs are idempotent by content hash: re-sending the same add while an
+earlier copy is queued, running, or finished within ``dedup_window``
+seconds returns the earlier job instead of storing it twice.
+"""
+import hashlib
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, List, Optional
+
+from request_log import start_request
+
+logger = logging.getLogger(__name__)
+
+STATUSES = ("queued", "running", "done", "failed")
+
+
+def content_key(payload: dict, fields: List[str]) -> str:
+    """Idempotency key: hash of the payload fields that define the add"""
+    content = json.dumps({k: payload.get(k) for k in fields}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class IngestQueue:
+    """SQLite-backed job queue with retrying worker threads"""
+
+    def __init__(
+        self,
+        path: str,
+        process: Callable[[dict], object],
+        num_workers: int = 4,
+        max_attempts: int = 5,
+        retry_delay: float = 5.0,
+        max_retry_delay: float = 300.0,
+        dedup_window: float = 3600.0,
+        retention: float = 7 * 24 * 3600,
+        lease: float = 60.0,
+        ready: Optional[Callable[[float], bool]] = None,
+        transient: Optional[Callable[[Exception], bool]] = None,
+    ):
+        self.path = path
+        self.process = process
+        self.num_workers = num_workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.dedup_window = dedup_window
+        self.retention = retention
+        self.lease = lease
+        self.ready = ready
+        self.transient = transient
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._lease_thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self.processed = 0
+        self.retried = 0
+        self.failed = 0
+        self.duplicates = 0
+        self.deferred = 0
+
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")  # A job is on disk before it is acknowledged
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS ingest_jobs ("
+            "id TEXT PRIMARY KEY, content_key TEXT NOT NULL, payload TEXT NOT NULL, "
+            "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "result TEXT, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL, "
+            "next_attempt_at REAL NOT NULL, owner TEXT, lease_until REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS ingest_jobs_due ON ingest_jobs (status, next_attempt_at)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS ingest_jobs_content ON ingest_jobs (content_key)")
+
+    def start(self):
+        """Requeue jobs whose lease expired and start the workers (idempotent)"""
+        if self._threads:
+            return
+        self.requeue_expired()
+        self._stopping = False
+        for i in range(self.num_workers):
+            thread = threading.Thread(target=self._run, name=f"ingest-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self._lease_thread = threading.Thread(target=self._keep_leases, name="ingest-leases", daemon=True)
+        self._lease_thread.start()
+        logger.info(f"📥 Ingest queue started with {self.num_workers} worker(s) ({self.path})")
+
+    def stop(self, timeout: float = 30.0):
+        """Stop the workers; running jobs finish, queued ones stay on disk"""
+        with self._lock:
+            self._stopping = True
+            self._lock.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+        if self._lease_thread is not None:
+            self._lease_thread.join(timeout=timeout)
+            self._lease_thread = None
+
+    def enqueue(self, payload: dict, key: str) -> tuple:
+        """Store a job; return (job_id, duplicate)"""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id FROM ingest_jobs WHERE content_key = ? AND "
+                "(status IN ('queued', 'running') OR (status = 'done' AND created_at > ?)) "
+                "ORDER BY created_at DESC LIMIT 1",
+                (key, now - self.dedup_window),
+            ).fetchone()
+            if row:
+                self.duplicates += 1
+                return row[0], True
+            job_id = uuid.uuid4().hex
+            self._db.execute(
+                "INSERT INTO ingest_jobs (id, content_key, payload, status, created_at, updated_at, next_attempt_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, key, json.dumps(payload, ensure_ascii=False), now, now, now),
+            )
+            self._lock.notify()
+            return job_id, False
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, status, attempts, result, error, created_at, updated_at, next_attempt_at, payload "
+                "FROM ingest_jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job = {
+            "job_id": row[0],
+            "status": row[1],
+            "attempts": row[2],
+            "result": json.loads(row[3]) if row[3] else None,
+            "error": row[4],
+            "created_at": row[5],
+            "updated_at": row[6],
+            "conversation_id": json.loads(row[8]).get("user_id"),
+        }
+        if row[1] == "queued" and row[2]:
+            job["next_attempt_at"] = row[7]
+        return job
+
+    def requeue_expired(self) -> int:
+        """Put running jobs whose lease ran out (their process died) back in the queue"""
+        now = time.time()
+        with self._lock:
+            requeued = self._db.execute(
+                "UPDATE ingest_jobs SET status = 'queued', owner = NULL, lease_until = NULL, next_attempt_at = ? "
+                "WHERE status = 'running' AND (lease_until IS NULL OR lease_until < ?)",
+                (now, now),
+            ).rowcount
+            if requeued:
+                self._lock.notify_all()
+        if requeued:
+            logger.info(f"📥 Requeued {requeued} interrupted ingest job(s)")
+        return requeued
+
+    def _keep_leases(self):
+        # Renew the leases of our running jobs and pick up jobs other processes abandoned
+        while True:
+            with self._lock:
+                if self._stopping:
+                    return
+                self._db.execute(
+                    "UPDATE ingest_jobs SET lease_until = ? WHERE status = 'running' AND owner = ?",
+                    (time.time() + self.lease, self.owner),
+                )
+                self._lock.wait(self.lease / 3)
+                if self._stopping:
+                    return
+            self.requeue_expired()
+
+    def _claim(self) -> Optional[tuple]:
+        # Caller holds self._lock; the status guard keeps a job from being
+        # claimed twice when other processes share the file
+        while True:
+            now = time.time()
+            row = self._db.execute(
+                "SELECT id, payload, attempts FROM ingest_jobs WHERE status = 'queued' AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            claimed = self._db.execute(
+                "UPDATE ingest_jobs SET status = 'running', attempts = attempts + 1, owner = ?, lease_until = ?, "
+                "updated_at = ? WHERE id = ? AND status = 'queued'",
+                (self.owner, now + self.lease, now, row[0]),
+            ).rowcount
+            if claimed:
+                return row[0], json.loads(row[1]), row[2] + 1
+
+    def _next_due(self) -> Optional[float]:
+        row = self._db.execute("SELECT MIN(next_attempt_at) FROM ingest_jobs WHERE status = 'queued'").fetchone()
+        return row[0] if row else None
+
+    def _wait_ready(self):
+        while self.ready is not None and not self._stopping and not self.ready(1.0):
+            pass
+
+    def _run(self):
+        self._wait_ready()
+        while True:
+            with self._lock:
+                job = None
+                while not self._stopping:
+                    job = self._claim()
+                    if job is not None:
+                        break
+                    next_due = self._next_due()
+                    self._lock.wait(None if next_due is None else max(0.05, next_due - time.time()))
+                if self._stopping and job is None:
+                    return
+            self._execute(*job)
+
+    def _execute(self, job_id: str, payload: dict, attempt: int):
+        start_request(f"job-{job_id[:12]}")
+        try:
+            result = self.process(payload)
+        except Exception as e:
+            error = str(getattr(e, "detail", None) or e)
+            now = time.time()
+            if self.transient is not None and self.transient(e):
+                # Backend not ready: try again later without using up an attempt
+                with self._lock:
+                    self._db.execute(
+                        "UPDATE ingest_jobs SET status = 'queued', attempts = attempts - 1, owner = NULL, "
+                        "lease_until = NULL, error = ?, updated_at = ?, next_attempt_at = ? WHERE id = ? AND owner = ?",
+                        (error, now, now + self.retry_delay, job_id, self.owner),
+                    )
+                    self.deferred += 1
+                    self._lock.notify()
+                logger.warning(f"⚠️  Ingest job deferred, backend unavailable: {error}")
+                self._wait_ready()
+                return
+            with self._lock:
+                if attempt < self.max_attempts:
+                    delay = min(self.retry_delay * 2 ** (attempt - 1), self.max_retry_delay)
+                    self._db.execute(
+                        "UPDATE ingest_jobs SET status = 'queued', owner = NULL, lease_until = NULL, error = ?, "
+                        "updated_at = ?, next_attempt_at = ? WHERE id = ? AND owner = ?",
+                        (error, now, now + delay, job_id, self.owner),
+                    )
+                    self.retried += 1
+                    logger.warning(f"⚠️  Ingest job failed (attempt {attempt}/{self.max_attempts}), retrying in {delay:.0f}s: {error}")
+                else:
+                    self._db.execute(
+                        "UPDATE ingest_jobs SET status = 'failed', owner = NULL, lease_until = NULL, error = ?, "
+                        "updated_at = ? WHERE id = ? AND owner = ?",
+                        (error, now, job_id, self.owner),
+                    )
+                    self.failed += 1
+                    logger.error(f"❌ Ingest job failed after {attempt} attempts: {error}")
+                self._lock.notify()
+            return
+        with self._lock:
+            self._db.execute(
+                "UPDATE ingest_jobs SET status = 'done', owner = NULL, lease_until = NULL, result = ?, error = NULL, "
+                "updated_at = ? WHERE id = ?",
+                (json.dumps(result, ensure_ascii=False, default=str), time.time(), job_id),
+            )
+            self.processed += 1
+            self._purge()
+
+    def _purge(self):
+        # Caller holds self._lock; drop finished jobs past the retention period
+        if self.processed % 100 == 0:
+            self._db.execute(
+                "DELETE FROM ingest_jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+                (time.time() - self.retention,),
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._db.execute("SELECT status, COUNT(*) FROM ingest_jobs GROUP BY status").fetchall())
+        return {
+            **{status: counts.get(status, 0) for status in STATUSES},
+            "workers": len(self._threads),
+            "processed": self.processed,
+            "retried": self.retried,
+            "failed_total": self.failed,
+            "duplicates": self.duplicates,
+            "deferred": self.deferred,
+        }
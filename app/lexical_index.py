@@ -0,0 +1,257 @@
+"""
+Per-user lexical (BM25) index for hybrid search.
+
+Each user's memories are indexed on first use (via a loader callback that
+scrolls Qdrant) and then kept up to date incrementally as memories are
+added, updated or deleted through the API. Scoring is BM25 Okapi with the
+non-negative (Lucene) IDF, log(1 + (N - df + 0.5) / (df + 0.5)); each user
+keeps term postings, so a search only scores documents sharing a query term
+and a write does not rebuild the user's whole index.
+
+Each user's index has its own lock, so one user's search does not wait on
+another's. Writes that arrive while a user's index is loading are queued
+and replayed once the load finishes.
+
+Writes served by another process (other API workers) never reach this
+index; with ``ttl`` set, a user's index is reloaded once it is ``ttl``
+seconds old so such writes show up after at most that long.
+"""
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# Thai script has no spaces between words, so Thai runs are indexed as
+# overlapping character bigrams; everything else splits on word characters.
+_THAI_RUN = re.compile(r"[\u0e00-\u0e7f]+")
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokenise mixed Thai/English text for BM25"""
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    tokens = []
+    for part in _THAI_RUN.split(text):
+        tokens.extend(_WORD.findall(part))
+    for run in _THAI_RUN.findall(text):
+        if len(run) <= 2:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+class _UserIndex:
+    def __init__(self):
+        self.docs: Dict[str, Counter] = {}
+        self.lengths: Dict[str, int] = {}
+        self.records: Dict[str, dict] = {}
+        self.postings: Dict[str, Set[str]] = {}
+        self.total_length = 0
+        self.loaded_at = time.monotonic()
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.pending: Optional[List[tuple]] = []  # Writes made while loading; None once loaded
+        self.error: Optional[Exception] = None
+
+    def apply(self, op: str, doc_id: str, *args):
+        # Caller holds self.lock
+        if self.pending is not None:
+            self.pending.append((op, doc_id) + args)
+        elif op == "upsert":
+            self.upsert(doc_id, *args)
+        elif op == "remove":
+            self.remove(doc_id)
+        elif op == "update_text":
+            record = self.records.get(doc_id)
+            if record is not None:
+                self.upsert(doc_id, args[0], dict(record, memory=args[0]))
+
+    def upsert(self, doc_id: str, text: str, record: dict):
+        self.remove(doc_id)
+        terms = Counter(tokenize(text))
+        self.docs[doc_id] = terms
+        self.lengths[doc_id] = sum(terms.values())
+        self.records[doc_id] = record
+        self.total_length += self.lengths[doc_id]
+        for term in terms:
+            self.postings.setdefault(term, set()).add(doc_id)
+
+    def remove(self, doc_id: str):
+        terms = self.docs.pop(doc_id, None)
+        if terms is None:
+            return
+        self.total_length -= self.lengths.pop(doc_id)
+        self.records.pop(doc_id, None)
+        for term in terms:
+            docs = self.postings[term]
+            docs.discard(doc_id)
+            if not docs:
+                del self.postings[term]
+
+    def search(self, query: str, limit: int, k1: float, b: float,
+               predicate: Optional[Callable[[dict], bool]] = None) -> List[Tuple[str, float]]:
+        n = len(self.docs)
+        if not n:
+            return []
+        avgdl = self.total_length / n or 1.0
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log((n - len(docs) + 0.5) / (len(docs) + 0.5) + 1.0)
+            for doc_id in docs:
+                tf = self.docs[doc_id][term]
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (k1 + 1) / (
+                    tf + k1 * (1 - b + b * self.lengths[doc_id] / avgdl))
+        hits = [
+            (doc_id, score) for doc_id, score in scores.items()
+            if score > 0 and (predicate is None or predicate(self.records[doc_id]))
+        ]
+        hits.sort(key=lambda item: item[1], reverse=True)
+        return hits[:limit]
+
+
+class LexicalIndex:
+    """BM25 indexes keyed by user_id, loaded lazily and LRU-bounded"""
+
+    def __init__(self, loader: Callable[[str], Iterable[Tuple[str, str, dict]]],
+                 max_users: int = 1000, k1: float = 1.5, b: float = 0.75, ttl: float = 0.0):
+        self.loader = loader
+        self.max_users = max_users
+        self.ttl = ttl
+        self.k1 = k1
+        self.b = b
+        self._users: "OrderedDict[str, _UserIndex]" = OrderedDict()
+        self._lock = threading.Lock()  # Guards _users only; each user index has its own lock
+
+    def _get(self, user_id: str, load: bool) -> Optional[_UserIndex]:
+        """The user's index; with ``load``, load it (or wait for a load in progress)"""
+        with self._lock:
+            index = self._users.get(user_id)
+            if (index is not None and self.ttl and index.ready.is_set()
+                    and time.monotonic() - index.loaded_at > self.ttl):
+                del self._users[user_id]
+                index = None
+            if index is None and not load:
+                return None
+            if index is not None:
+                self._users.move_to_end(user_id)
+                owner = False
+            else:
+                index = self._users[user_id] = _UserIndex()
+                while len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+                owner = True
+        if owner:
+            self._load(user_id, index)
+        elif load:
+            index.ready.wait()
+            if index.error is not None:
+                raise index.error
+        return index
+
+    def _load(self, user_id: str, index: _UserIndex):
+        # Scroll without holding any lock; writes meanwhile queue up in index.pending
+        try:
+            rows = list(self.loader(user_id))
+        except Exception as e:
+            with self._lock:
+                if self._users.get(user_id) is index:
+                    del self._users[user_id]
+            index.error = e
+            index.ready.set()
+            raise
+        with index.lock:
+            for doc_id, text, record in rows:
+                index.upsert(doc_id, text, record)
+            pending, index.pending = index.pending, None
+            for op in pending:
+                index.apply(*op)
+            index.loaded_at = time.monotonic()
+        index.ready.set()
+
+    def search(self, user_id: str, query: str, limit: int,
+               predicate: Optional[Callable[[dict], bool]] = None) -> List[Tuple[dict, float]]:
+        index = self._get(user_id, load=True)
+        with index.lock:
+            hits = index.search(query, limit, self.k1, self.b, predicate)
+            return [(index.records[doc_id], score) for doc_id, score in hits]
+
+    def upsert(self, user_id: str, doc_id: str, text: str, record: dict):
+        """Apply a write to a loaded or loading user index (unloaded users load fresh later)"""
+        index = self._get(user_id, load=False)
+        if index is not None:
+            with index.lock:
+                index.apply("upsert", doc_id, text, record)
+
+    def update_text(self, doc_id: str, text: str):
+        """Re-index a memory whose text changed, in whichever user holds it"""
+        for index in self._indexes():
+            with index.lock:
+                index.apply("update_text", doc_id, text)
+
+    def remove(self, doc_id: str, user_id: Optional[str] = None):
+        if user_id:
+            index = self._get(user_id, load=False)
+            targets = [index] if index is not None else []
+        else:
+            targets = self._indexes()
+        for index in targets:
+            with index.lock:
+                index.apply("remove", doc_id)
+
+    def _indexes(self) -> List[_UserIndex]:
+        with self._lock:
+            return list(self._users.values())
+
+    def stats(self) -> dict:
+        indexes = self._indexes()
+        return {
+            "users": len(indexes),
+            "max_users": self.max_users,
+            "ttl": self.ttl,
+            "documents": sum(len(index.docs) for index in indexes),
+        }
+
+
+def reciprocal_rank_fusion(ranked_lists: List[Tuple[List[str], float]], k: int = 60) -> Dict[str, float]:
+    """Fuse ranked id lists: score = sum(weight / (k + rank))"""
+    scores: Dict[str, float] = {}
+    for ids, weight in ranked_lists:
+        for rank, doc_id in enumerate(ids, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight / (k + rank)
+    return scores
+
+
+def fuse_results(vector_items: List[dict], lexical_hits: List[Tuple[dict, float]], limit: int,
+                 vector_weight: float = 1.0, bm25_weight: float = 1.0, k: int = 60) -> List[dict]:
+    """Merge vector and BM25 results with weighted reciprocal-rank fusion.
+
+    ``score`` on each returned item is the fused score; the original
+    cosine score and the BM25 score are kept as ``vector_score`` and
+    ``bm25_score``.
+    """
+    fused = reciprocal_rank_fusion([
+        ([item["id"] for item in vector_items], vector_weight),
+        ([record["id"] for record, _ in lexical_hits], bm25_weight),
+    ], k=k)
+    items = {record["id"]: dict(record) for record, _ in lexical_hits}
+    bm25_scores = {record["id"]: score for record, score in lexical_hits}
+    vector_scores = {}
+    for item in vector_items:
+        items[item["id"]] = dict(item)
+        vector_scores[item["id"]] = item.get("score")
+
+    results = []
+    for doc_id in sorted(fused, key=fused.get, reverse=True)[:limit]:
+        item = items[doc_id]
+        item["vector_score"] = vector_scores.get(doc_id)
+        item["bm25_score"] = bm25_scores.get(doc_id)
+        item["score"] = round(fused[doc_id], 6)
+        results.append(item)
+    return results
@@ -0,0 +1,139 @@
+"""
+Shared, process-wide LLM client.
+
+Every LLM call (tag generation and Mem0's own extraction/update prompts)
+goes through one pooled OpenAI client so HTTP keep-alive connections to
+LLM_BASE_URL are reused instead of paying a TLS handshake per call. Token
+usage of every completion on that client is counted.
+"""
+import os
+import threading
+
+import httpx
+from openai import OpenAI
+
+from executors import backends
+
+_lock = threading.Lock()
+_client = None
+
+
+class LLMClient:
+    """OpenAI client with a bounded connection pool, timeouts and retries"""
+
+    def __init__(
+        self,
+        api_key: str = None,
+        base_url: str = None,
+        model: str = None,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 60.0,
+        timeout: float = 60.0,
+        connect_timeout: float = 10.0,
+        max_retries: int = 3,
+    ):
+        self.model = model or os.getenv("LLM_MODEL", "ptm-oss-120b")
+        self.max_connections = max_connections
+        self.http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+        )
+        # The OpenAI SDK retries connection errors, 429s and 5xx responses
+        # with exponential backoff; max_retries bounds the attempts.
+        self.openai = OpenAI(
+            api_key=api_key or os.getenv("LLM_API_KEY"),
+            base_url=base_url or os.getenv("LLM_BASE_URL", "https://tokenmind.abdul.in.th/v1"),
+            http_client=self.http_client,
+            max_retries=max_retries,
+        )
+        self._stats_lock = threading.Lock()
+        self.in_flight = 0
+        self.total_calls = 0
+        self.failed_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        # Count tokens for Mem0's calls too: they use this client directly
+        completions = self.openai.chat.completions
+        completions.create = self._count_tokens(completions.create)
+
+    def _count_tokens(self, create):
+        def create_with_usage(*args, **kwargs):
+            response = create(*args, **kwargs)
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                with self._stats_lock:
+                    self.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+                    self.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+            return response
+        return create_with_usage
+
+    def chat(self, messages: list, **kwargs):
+        """Run a chat completion on the shared client"""
+        kwargs.setdefault("model", self.model)
+        with self._stats_lock:
+            self.in_flight += 1
+            self.total_calls += 1
+        try:
+            with backends["llm"].slot("chat"):
+                return self.openai.chat.completions.create(messages=messages, **kwargs)
+        except Exception:
+            with self._stats_lock:
+                self.failed_calls += 1
+            raise
+        finally:
+            with self._stats_lock:
+                self.in_flight -= 1
+
+    def stats(self) -> dict:
+        """Report call counters and connection pool utilisation"""
+        stats = {
+            "in_flight": self.in_flight,
+            "total_calls": self.total_calls,
+            "failed_calls": self.failed_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "max_connections": self.max_connections,
+        }
+        # httpx does not expose pool state publicly; read it from httpcore
+        # when available and skip it otherwise.
+        try:
+            connections = list(self.http_client._transport._pool.connections)
+            idle = sum(1 for c in connections if c.is_idle())
+            stats["open_connections"] = len(connections)
+            stats["idle_connections"] = idle
+            stats["active_connections"] = len(connections) - idle
+            stats["pool_utilisation"] = round((len(connections) - idle) / self.max_connections, 3)
+        except Exception:
+            pass
+        return stats
+
+    def close(self):
+        self.http_client.close()
+
+
+def get_llm_client() -> LLMClient:
+    """Return the process-wide LLM client, creating it on first use"""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = LLMClient(
+                    max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", 20)),
+                    max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE", 10)),
+                    timeout=float(os.getenv("LLM_TIMEOUT", 60)),
+                    connect_timeout=float(os.getenv("LLM_CONNECT_TIMEOUT", 10)),
+                    max_retries=int(os.getenv("LLM_MAX_RETRIES", 3)),
+                )
+    return _client
+
+
+def attach_to_memory(memory):
+    """Point an object's Mem0 LLM (a Memory or a graph store) at the shared OpenAI client"""
+    llm = getattr(memory, "llm", None)
+    if llm is not None and hasattr(llm, "client"):
+        llm.client = get_llm_client().openai
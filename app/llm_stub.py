@@ -0,0 +1,313 @@
+"""
+Local OpenAI-compatible stand-in for the LLM and embedding servers.
+
+Answers ``POST /v1/chat/completions`` and ``POST /v1/embeddings`` without
+any model, so the full add/search pipeline can run offline and at high
+request rates (benchmarks, load tests):
+
+- tag prompts get comma-separated tags picked by keyword;
+- JSON prompts (Mem0 fact extraction / memory update) get the sentences
+  of the conversation back as facts, each added as a new memory;
+- embeddings are hashed character trigrams, so texts sharing words land
+  close together (Thai included) - deterministic, not semantic.
+
+Every response waits ``LLM_STUB_LATENCY_MS`` (+/- ``LLM_STUB_JITTER_MS``);
+embeddings wait ``EMBED_STUB_LATENCY_MS``.
+
+Record/replay (``LLM_STUB_MODE``), for real LLM replies without the cost:
+
+- ``record`` forwards chat calls to ``LLM_STUB_UPSTREAM`` (default
+  LLM_BASE_URL, with LLM_API_KEY) and appends each request/response pair
+  to the ``LLM_STUB_CASSETTE`` JSONL file;
+- ``replay`` answers from the cassette - repeated requests get the
+  recorded replies in order - after the configured latency, or the
+  recorded one with ``LLM_STUB_LATENCY_MS=recorded``. Requests that were
+  never recorded get the canned reply (``LLM_STUB_REPLAY_MISS=stub``) or
+  a 404 (``error``).
+
+Requests match on model, messages, response format, tools and
+temperature, with dates and timestamps masked so recordings stay valid
+on other days.
+
+Run:
+    python llm_stub.py                     # listens on LLM_STUB_PORT (8090)
+    LLM_STUB_MODE=record LLM_STUB_CASSETTE=add.jsonl python llm_stub.py
+    LLM_STUB_MODE=replay LLM_STUB_CASSETTE=add.jsonl python llm_stub.py
+
+Then start the API with LLM_BASE_URL=http://localhost:8090/v1 (and
+EMBEDDING_SERVER_URL=http://localhost:8090/v1 to skip loading bge-m3).
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Union
+
+import httpx
+import numpy as np
+import uvicorn
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+load_dotenv()
+
+MODE = os.getenv("LLM_STUB_MODE", "stub").lower()  # stub, record or replay
+CASSETTE_PATH = os.getenv("LLM_STUB_CASSETTE", "llm_cassette.jsonl")
+UPSTREAM_URL = os.getenv("LLM_STUB_UPSTREAM") or os.getenv("LLM_BASE_URL", "https://tokenmind.abdul.in.th/v1")
+REPLAY_MISS = os.getenv("LLM_STUB_REPLAY_MISS", "stub").lower()
+REPLAY_RECORDED_LATENCY = os.getenv("LLM_STUB_LATENCY_MS", "").lower() == "recorded"
+LATENCY_MS = 0.0 if REPLAY_RECORDED_LATENCY else float(os.getenv("LLM_STUB_LATENCY_MS", 200))
+JITTER_MS = float(os.getenv("LLM_STUB_JITTER_MS", 50))
+EMBED_LATENCY_MS = float(os.getenv("EMBED_STUB_LATENCY_MS", 5))
+EMBEDDING_DIMS = int(os.getenv("EMBEDDING_MODEL_DIMS", 1024))
+
+app = FastAPI(title="LLM Stub", description="OpenAI-compatible stand-in for offline runs")
+
+TAG_KEYWORDS = {
+    "food": ["food", "eat", "pizza", "sushi", "coffee", "กิน", "อาหาร", "ก๋วยเตี๋ยว", "กาแฟ", "ส้มตำ"],
+    "work": ["work", "job", "company", "developer", "engineer", "ทำงาน", "บริษัท", "งาน"],
+    "tech": ["python", "typescript", "ai", "code", "programming", "โปรแกรม"],
+    "sports": ["f1", "football", "running", "gym", "racing", "วิ่ง", "ฟุตบอล"],
+    "travel": ["travel", "trip", "japan", "เที่ยว", "ญี่ปุ่น"],
+    "health": ["allergic", "doctor", "health", "แพ้", "สุขภาพ"],
+    "preference": ["like", "love", "favourite", "favorite", "prefer", "ชอบ"],
+}
+
+_stats = {"chat": 0, "embeddings": 0, "recorded": 0, "replayed": 0, "replay_misses": 0}
+
+# Dates and times in prompts (Mem0 adds today's date) must not break matching
+_VOLATILE = re.compile(r"\d{4}-\d{2}-\d{2}([T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?([+-]\d{2}:?\d{2}|Z)?)?")
+
+
+class ChatRequest(BaseModel):
+    model: Optional[str] = None
+    messages: List[dict]
+    response_format: Optional[dict] = None
+    tools: Optional[list] = None
+
+    model_config = {"extra": "allow"}
+
+
+class EmbeddingRequest(BaseModel):
+    input: Union[str, List[str]]
+    model: Optional[str] = None
+    dimensions: Optional[int] = None
+    encoding_format: Optional[str] = None
+
+
+def request_key(body: dict) -> str:
+    """Match key of a chat request: its replay-relevant fields, dates masked"""
+    relevant = {k: body.get(k) for k in ("model", "messages", "response_format", "tools", "temperature")}
+    canonical = json.dumps(relevant, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(_VOLATILE.sub("<date>", canonical).encode()).hexdigest()
+
+
+class Cassette:
+    """Recorded chat request/response pairs in a JSONL file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._responses: Dict[str, List[dict]] = {}
+        self._next: Dict[str, int] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._responses.setdefault(entry["key"], []).append(entry)
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._responses.values())
+
+    def record(self, body: dict, response: dict, latency_ms: float):
+        entry = {
+            "key": request_key(body),
+            "request": body,
+            "response": response,
+            "latency_ms": round(latency_ms, 1),
+            "recorded_at": time.time(),
+        }
+        with self._lock:
+            self._responses.setdefault(entry["key"], []).append(entry)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def lookup(self, body: dict) -> Optional[dict]:
+        """Next recorded entry for this request (cycling), or None"""
+        key = request_key(body)
+        with self._lock:
+            entries = self._responses.get(key)
+            if not entries:
+                return None
+            index = self._next.get(key, 0)
+            self._next[key] = index + 1
+            return entries[index % len(entries)]
+
+
+cassette = Cassette(CASSETTE_PATH) if MODE in ("record", "replay") else None
+_upstream = None
+
+
+def _upstream_client() -> httpx.AsyncClient:
+    global _upstream
+    if _upstream is None:
+        _upstream = httpx.AsyncClient(
+            base_url=UPSTREAM_URL.rstrip("/"),
+            headers={"Authorization": f"Bearer {os.getenv('LLM_API_KEY', '')}"},
+            timeout=httpx.Timeout(float(os.getenv("LLM_TIMEOUT", 60)), connect=10.0),
+        )
+    return _upstream
+
+
+def _sentences(text: str) -> List[str]:
+    parts = re.split(r"(?<=[.!?])\s+|\n+", text)
+    return [p.strip(" -") for p in parts if len(p.strip(" -")) > 3]
+
+
+def _conversation_facts(messages: List[dict]) -> List[str]:
+    """Sentences the user said, as they appear in Mem0's prompts"""
+    prompt = "\n".join(str(m.get("content") or "") for m in messages)
+    # Memory update prompt: the new facts are the last fenced block
+    if "new retrieved facts" in prompt:
+        blocks = re.findall(r"```(.*?)```", prompt, flags=re.S)
+        if blocks:
+            try:
+                facts = json.loads(blocks[-1].strip())
+                return [str(f) for f in facts]
+            except ValueError:
+                pass
+    # Extraction prompts render the conversation as "user: ..." lines
+    said = re.findall(r"^\s*user:\s*(.+)$", prompt, flags=re.M)
+    if said:
+        return [s for line in said for s in _sentences(line)]
+    user = [m for m in messages if m.get("role") == "user"]
+    return _sentences(str(user[-1].get("content") or "")) if user else []
+
+
+def _tags(text: str) -> str:
+    lowered = text.lower()
+    tags = [tag for tag, words in TAG_KEYWORDS.items() if any(w in lowered for w in words)]
+    return ", ".join((tags or ["personal", "general"])[:4])
+
+
+def complete(messages: List[dict], response_format: Optional[dict] = None) -> str:
+    """Canned reply for a chat request (deterministic)"""
+    last = str(messages[-1].get("content") or "") if messages else ""
+    if "comma-separated tags" in last:
+        match = re.search(r'memory: "(.*)"', last, flags=re.S)
+        return _tags(match.group(1) if match else last)
+    if (response_format or {}).get("type") == "json_object" or "json" in last.lower():
+        facts = list(dict.fromkeys(_conversation_facts(messages)))
+        # "facts" for Mem0's extraction step, "memory" for its update step
+        return json.dumps({
+            "facts": facts,
+            "memory": [{"id": str(i), "text": fact, "event": "ADD"} for i, fact in enumerate(facts)],
+        }, ensure_ascii=False)
+    return "OK"
+
+
+def embed(text: str, dims: int = EMBEDDING_DIMS) -> List[float]:
+    """Hashed character-trigram vector, L2-normalised"""
+    vector = np.zeros(dims, dtype=np.float32)
+    padded = f"  {text.lower()}  "
+    for i in range(len(padded) - 2):
+        digest = hashlib.blake2b(padded[i:i + 3].encode(), digest_size=8).digest()
+        index = int.from_bytes(digest[:4], "little") % dims
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = float(np.linalg.norm(vector))
+    return (vector / norm if norm else vector).tolist()
+
+
+async def _delay(latency_ms: float, jitter_ms: float = 0.0):
+    ms = max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms))
+    if ms:
+        await asyncio.sleep(ms / 1000.0)
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def chat_response(model: str, content: str, prompt_text: str) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model or "stub",
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": _tokens(prompt_text),
+            "completion_tokens": _tokens(content),
+            "total_tokens": _tokens(prompt_text) + _tokens(content),
+        },
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: ChatRequest):
+    """OpenAI-compatible chat completions (canned, recorded or replayed)"""
+    _stats["chat"] += 1
+    body = request.model_dump(exclude_none=True)
+    if MODE == "record":
+        start = time.perf_counter()
+        response = await _upstream_client().post("/chat/completions", json=body)
+        if response.status_code != 200:
+            raise HTTPException(status_code=response.status_code, detail=response.text)
+        reply = response.json()
+        cassette.record(body, reply, (time.perf_counter() - start) * 1000.0)
+        _stats["recorded"] += 1
+        return reply
+    if MODE == "replay":
+        entry = cassette.lookup(body)
+        if entry is not None:
+            _stats["replayed"] += 1
+            await _delay(entry["latency_ms"] if REPLAY_RECORDED_LATENCY else LATENCY_MS, JITTER_MS)
+            return entry["response"]
+        _stats["replay_misses"] += 1
+        if REPLAY_MISS == "error":
+            raise HTTPException(status_code=404, detail="Request not in cassette")
+    await _delay(LATENCY_MS, JITTER_MS)
+    content = complete(request.messages, request.response_format)
+    prompt_text = "".join(str(m.get("content") or "") for m in request.messages)
+    return chat_response(request.model, content, prompt_text)
+
+
+@app.post("/v1/embeddings")
+async def embeddings(request: EmbeddingRequest):
+    """OpenAI-compatible embeddings endpoint"""
+    _stats["embeddings"] += 1
+    texts = [request.input] if isinstance(request.input, str) else request.input
+    await _delay(EMBED_LATENCY_MS)
+    dims = request.dimensions or EMBEDDING_DIMS
+    return {
+        "object": "list",
+        "model": request.model or "stub",
+        "data": [{"object": "embedding", "index": i, "embedding": embed(t, dims)} for i, t in enumerate(texts)],
+        "usage": {"prompt_tokens": 0, "total_tokens": 0},
+    }
+
+
+@app.get("/health")
+def health_check():
+    return {
+        "status": "healthy",
+        "mode": MODE,
+        "latency_ms": "recorded" if REPLAY_RECORDED_LATENCY else LATENCY_MS,
+        "cassette": {"path": CASSETTE_PATH, "entries": len(cassette)} if cassette is not None else None,
+        "requests": _stats,
+    }
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("LLM_STUB_PORT", 8090)), log_level="warning")
@@ -1,18 +1,61 @@
 import os
+import sys
+import asyncio
 import json
-import re
+import time
+import logging
+import zlib
+import base64
+import uuid
+import hashlib
+from datetime import datetime, timedelta
+import pytz
 from dotenv import load_dotenv
 from mem0 import Memory
-from fastapi import FastAPI, HTTPException
+from mem0.configs.base import MemoryConfig
+from mem0.memory.graph_memory import MemoryGraph
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional, List
 import uvicorn
-from openai import OpenAI
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    PointStruct, Filter, FieldCondition, MatchValue, MatchText, DatetimeRange,
+    PayloadSchemaType, TextIndexParams, TextIndexType, TokenizerType, OrderBy, Direction,
+)
+from llm_client import get_llm_client, attach_to_memory
+from tagging import generate_tags, generate_tags_batch, tag_cache, TagWorker
+from embedding import embed_texts, install_batcher
+from embedding_cache import EmbeddingCache
+from onnx_embedder import onnx_embedder_from_env
+from lexical_index import LexicalIndex, fuse_results
+from executors import BackendBusy, pools, instrument_memory, instrument_graph, instrument_qdrant_client, executor_stats
+from startup import BackendManager
+from vector_collection import CollectionSettings, ensure_collection, install_search_params
+from dim_reduction import reducer_from_env, install_reducer
+from search_cache import SearchCache
+from retention import MemoryReaper, delete_in_batches, expired_filter, expires_at
+from coalescing import AddCoalescer
+from ingest_queue import IngestQueue, content_key
+from search_pipeline import SearchPipeline, CrossEncoderReranker
+from request_log import (
+    setup_logging, stop_logging, logging_stats, start_request, annotate, payload_sampled, clip, propagate_context,
+)
+from metrics import HTTP_IN_FLIGHT, observe_request, install_runtime_collector, render_metrics
 
 # Load environment variables
 load_dotenv()
 
+# Structured logs through a background writer (LOG_LEVEL, LOG_FORMAT)
+setup_logging()
+logger = logging.getLogger("mem0_api")
+
+# Mem0 runs vector and graph work on its own thread pools; let them keep
+# the request's ID and stage timings
+propagate_context(sys.modules[Memory.__module__])
+
 # Initialize FastAPI
 app = FastAPI(title="Mem0 API", description="Memory Management for AI Agents")
 
@@ -25,9 +68,61 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+@app.middleware("http")
+async def log_requests(request: Request, call_next):
+    """Give each request an ID and write one access log line with its stage timings"""
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex[:16]
+    trace = start_request(request_id)
+    start = time.perf_counter()
+    status = 500
+    HTTP_IN_FLIGHT.inc()
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        # Stage timings so far (background work such as tagging is not included)
+        timings = trace.stages()
+        if timings:
+            response.headers["Server-Timing"] = ", ".join(f"{name};dur={ms}" for name, ms in timings.items())
+        return response
+    finally:
+        HTTP_IN_FLIGHT.dec()
+        seconds = time.perf_counter() - start
+        duration_ms = round(seconds * 1000.0, 1)
+        # Label by route template (/memory/history/{memory_id}), not the raw path
+        route = request.scope.get("route")
+        observe_request(request.method, getattr(route, "path", "unmatched"), status, seconds)
+        if request.url.path not in ("/health", "/ready", "/metrics"):
+            logger.info("request", extra={
+                "method": request.method,
+                "path": request.url.path,
+                "status": status,
+                "duration_ms": duration_ms,
+                "stages": trace.stages(),
+                **trace.fields,
+            })
+
+# uvicorn worker processes; in-process state (caches, buffers) is not shared between them
+API_WORKERS = int(os.getenv("API_WORKERS", 1))
+
 # Mem0 Configuration with Custom LLM and Local Embeddings
 embedding_provider = os.getenv("EMBEDDING_PROVIDER", "huggingface")
 
+# Qdrant collection used by Mem0 (a reduced-dimension setup needs its own)
+COLLECTION_NAME = os.getenv("QDRANT_COLLECTION", "mem0")
+
+# Native embedding size of the model, and the size stored in Qdrant. Below
+# the native size, vectors are truncated or PCA-projected (dim_reduction.py)
+EMBEDDING_MODEL_DIMS = int(os.getenv("EMBEDDING_MODEL_DIMS", 1024))  # bge-m3
+EMBEDDING_DIMS = min(int(os.getenv("EMBEDDING_DIMS", EMBEDDING_MODEL_DIMS)), EMBEDDING_MODEL_DIMS)
+
+# Quantisation / HNSW settings of the Qdrant collection (see vector_collection.py)
+collection_settings = CollectionSettings()
+
+# Embedded Qdrant instead of a server: ":memory:" or a directory (local runs
+# and benchmarks, single worker only)
+QDRANT_PATH = os.getenv("QDRANT_PATH")
+
 config = {
     "llm": {
         "provider": "openai",
@@ -48,7 +143,9 @@ config = {
         "config": {
             "host": os.getenv("QDRANT_HOST", "localhost"),
             "port": int(os.getenv("QDRANT_PORT", 6333)),
-            "embedding_model_dims": 1024,  # bge-m3 dimension - FIXED to 1024
+            "collection_name": COLLECTION_NAME,
+            "embedding_model_dims": EMBEDDING_DIMS,
+            "on_disk": collection_settings.vectors_on_disk,
         }
     },
     "graph_store": {
@@ -61,23 +158,281 @@ config = {
     },
 }
 
-# Initialize Mem0
-print("🚀 Starting Mem0 initialization...", flush=True)
-print(f"   Neo4j URI: {os.getenv('NEO4J_URI', 'bolt://localhost:7687')}", flush=True)
-print(f"   Neo4j User: {os.getenv('NEO4J_USER', 'neo4j')}", flush=True)
-print(f"   Qdrant Host: {os.getenv('QDRANT_HOST', 'localhost')}", flush=True)
-try:
-    memory = Memory.from_config(config)
-    print("✅ Mem0 initialized successfully with Graph Memory!", flush=True)
-except Exception as e:
-    print(f"❌ Failed to initialize Mem0: {e}", flush=True)
-    import traceback
-    traceback.print_exc()
-    # Fallback: Initialize without graph_store
-    print("⚠️ Falling back to Vector-only mode...", flush=True)
-    config_fallback = {k: v for k, v in config.items() if k != "graph_store"}
-    memory = Memory.from_config(config_fallback)
-    print("✅ Mem0 initialized in Vector-only mode", flush=True)
+# Multi-worker mode: every API worker talks to one shared embedding server
+# (embedding_server.py, OpenAI-compatible) instead of loading its own model
+EMBEDDING_SERVER_URL = os.getenv("EMBEDDING_SERVER_URL")
+if EMBEDDING_SERVER_URL:
+    config["embedder"] = {
+        "provider": "openai",
+        "config": {
+            "model": os.getenv("EMBEDDING_MODEL", "BAAI/bge-m3"),
+            "api_key": "embedding-server",
+            "openai_base_url": EMBEDDING_SERVER_URL,
+            "embedding_dims": EMBEDDING_MODEL_DIMS,
+        }
+    }
+elif embedding_provider == "onnx":
+    # Mem0 has no ONNX provider: give it a placeholder embedder that loads
+    # nothing (the OpenAI client is lazy) and swap in OnnxEmbedding after build
+    config["embedder"] = {
+        "provider": "openai",
+        "config": {
+            "model": os.getenv("EMBEDDING_MODEL", "BAAI/bge-m3"),
+            "api_key": "onnx-placeholder",
+            "embedding_dims": EMBEDDING_MODEL_DIMS,
+        }
+    }
+
+# Mem0 is built in the background (see "Backend startup" below) so the
+# server binds immediately; handlers get it through require_memory()
+memory = None
+embedding_batcher = None
+
+# Cache query embeddings so repeated searches skip the embedder
+EMBED_CACHE_MB = int(os.getenv("EMBED_CACHE_MB", 64))
+embedding_cache = EmbeddingCache(max_bytes=EMBED_CACHE_MB * 1024 * 1024)
+
+def init_vector_memory():
+    """Build Mem0 without the graph store (loads the embedder, connects Qdrant)"""
+    global memory, embedding_batcher
+    logger.info(f"   Qdrant: {QDRANT_PATH or os.getenv('QDRANT_HOST', 'localhost')}")
+    # Create the collection with our quantisation/HNSW settings before Mem0
+    # does; Mem0 keeps an existing collection as it is
+    ensure_collection(
+        qdrant_client, COLLECTION_NAME,
+        config["vector_store"]["config"]["embedding_model_dims"], collection_settings,
+    )
+    vector_config = {k: v for k, v in config.items() if k != "graph_store"}
+    if QDRANT_PATH:
+        # Embedded Qdrant allows one client per storage; share ours with Mem0
+        vector_config["vector_store"] = {
+            "provider": "qdrant",
+            "config": {**config["vector_store"]["config"], "client": qdrant_client},
+        }
+    vector_memory = Memory.from_config(vector_config)
+    install_search_params(vector_memory.vector_store.client, collection_settings)
+    if embedding_provider == "onnx" and not EMBEDDING_SERVER_URL:
+        vector_memory.embedding_model = onnx_embedder_from_env()
+    
+    # Route Mem0's LLM calls through the shared pooled client and
+    # bound the concurrency of every backend Mem0 talks to
+    attach_to_memory(vector_memory)
+    instrument_memory(vector_memory)
+    
+    # Micro-batch concurrent embed calls from add and search into one encode
+    if os.getenv("EMBED_BATCHING", "true").lower() == "true":
+        embedding_batcher = install_batcher(
+            vector_memory.embedding_model,
+            max_batch_size=int(os.getenv("EMBED_BATCH_SIZE", 32)),
+            max_wait_ms=float(os.getenv("EMBED_BATCH_WAIT_MS", 5)),
+        )
+    
+    # Store reduced vectors (EMBEDDING_DIMS) - below the cache, so it holds the small ones
+    reducer = reducer_from_env(COLLECTION_NAME, EMBEDDING_MODEL_DIMS)
+    if reducer is not None:
+        install_reducer(vector_memory.embedding_model, reducer)
+        logger.info(f"📐 Embeddings reduced {EMBEDDING_MODEL_DIMS} -> {reducer.dims} dims ({reducer.method})")
+    
+    if EMBED_CACHE_MB > 0:
+        vector_memory.embedding_model.embed = embedding_cache.wrap(
+            vector_memory.embedding_model.embed,
+            f"{os.getenv('EMBEDDING_MODEL', 'BAAI/bge-m3')}@{EMBEDDING_DIMS}",
+        )
+    
+    memory = vector_memory
+    logger.info("✅ Mem0 initialized in Vector-only mode")
+    
+    # Mem0 has created the collection by now, so its payload indexes can be added
+    create_payload_indexes()
+
+def init_graph_store():
+    """Connect Neo4j and attach the graph store once the vector memory is up"""
+    logger.info(f"   Neo4j URI: {os.getenv('NEO4J_URI', 'bolt://localhost:7687')}")
+    logger.info(f"   Neo4j User: {os.getenv('NEO4J_USER', 'neo4j')}")
+    graph = MemoryGraph(MemoryConfig(**config))
+    attach_to_memory(graph)
+    instrument_graph(graph)
+    
+    backend_manager.wait("vector")
+    # The graph store builds its own embedder from the config; share ours
+    graph.embedding_model = memory.embedding_model
+    memory.graph = graph
+    memory.enable_graph = True
+    # Cached vector-only responses have no graph relations
+    search_cache.clear()
+    logger.info("✅ Graph Memory attached")
+
+def require_memory():
+    """Return the Mem0 instance, or 503 while it is still starting"""
+    if memory is None:
+        raise HTTPException(status_code=503, detail="Memory backend is starting, retry shortly")
+    return memory
+
+# Initialize Qdrant Client for Admin operations and tag patching
+if QDRANT_PATH:
+    qdrant_client = QdrantClient(location=":memory:") if QDRANT_PATH == ":memory:" else QdrantClient(path=QDRANT_PATH)
+else:
+    qdrant_client = QdrantClient(
+        host=os.getenv("QDRANT_HOST", "localhost"),
+        port=int(os.getenv("QDRANT_PORT", 6333))
+    )
+instrument_qdrant_client(qdrant_client)
+install_search_params(qdrant_client, collection_settings)
+
+def apply_tags(memory_ids: List[str], tags: List[str]):
+    """Patch the tags payload of stored memories in Qdrant"""
+    qdrant_client.set_payload(
+        collection_name=COLLECTION_NAME,
+        payload={"tags": tags},
+        points=memory_ids,
+    )
+    # Keep BM25 records in step, and drop the owners' cached searches: tag-filtered
+    # searches cached before the tags landed have missed these memories
+    points = qdrant_client.retrieve(
+        collection_name=COLLECTION_NAME, ids=memory_ids, with_payload=True, with_vectors=False,
+    )
+    for point in points:
+        payload = point.payload or {}
+        lexical_index.upsert(payload.get("user_id"), str(point.id), payload.get("data", ""), memory_record(point.id, payload))
+    for owner in {(point.payload or {}).get("user_id") for point in points} - {None}:
+        search_cache.invalidate_user(owner)
+    logger.info("🏷️  Tagged memories", extra={"memory_ids": memory_ids, "tags": tags})
+
+# Payload keys Mem0 returns at the top level of a result; the rest go under "metadata"
+CORE_PAYLOAD_KEYS = {"data", "hash", "created_at", "updated_at", "user_id", "agent_id", "run_id", "actor_id", "role"}
+
+def memory_record(memory_id: str, payload: dict) -> dict:
+    """Search-result shaped record for a stored memory payload"""
+    return {
+        "id": str(memory_id),
+        "memory": payload.get("data", ""),
+        "hash": payload.get("hash"),
+        "metadata": {key: value for key, value in payload.items() if key not in CORE_PAYLOAD_KEYS} or None,
+        "user_id": payload.get("user_id"),
+        "agent_id": payload.get("agent_id"),
+        "run_id": payload.get("run_id"),
+        "created_at": payload.get("created_at"),
+        "updated_at": payload.get("updated_at"),
+    }
+
+def load_user_memories(user_id: str):
+    """Scroll every stored memory of one user (feeds the lexical index)"""
+    scroll_filter = Filter(must=[FieldCondition(key="user_id", match=MatchValue(value=user_id))])
+    offset = None
+    while True:
+        points, offset = qdrant_client.scroll(
+            collection_name=COLLECTION_NAME,
+            scroll_filter=scroll_filter,
+            limit=500,
+            offset=offset,
+            with_payload=True,
+            with_vectors=False,
+        )
+        for point in points:
+            payload = point.payload or {}
+            yield str(point.id), payload.get("data", ""), memory_record(point.id, payload)
+        if offset is None:
+            break
+
+# Per-user BM25 index for hybrid search, kept in step with writes below. Other
+# workers' writes do not reach it, so with several workers it is reloaded
+# after LEXICAL_INDEX_TTL seconds
+lexical_index = LexicalIndex(
+    load_user_memories,
+    max_users=int(os.getenv("LEXICAL_INDEX_MAX_USERS", 1000)),
+    ttl=float(os.getenv("LEXICAL_INDEX_TTL", 0 if API_WORKERS == 1 else 30)),
+)
+
+# Recent /memory/search responses per user; dropped when that user's memories change.
+# Invalidation is per process, so the cache is off with several workers: a
+# write handled by one worker would leave the others serving stale results
+search_cache = SearchCache(
+    max_users=int(os.getenv("SEARCH_CACHE_USERS", 1000)) if API_WORKERS == 1 else 0,
+    entries_per_user=int(os.getenv("SEARCH_CACHE_ENTRIES", 32)),
+    ttl=float(os.getenv("SEARCH_CACHE_TTL", 60)),
+    # Exact repeats only by default; below 1.0, similar queries share results (see API docs)
+    threshold=float(os.getenv("SEARCH_CACHE_THRESHOLD", 1.0)),
+)
+
+def memory_owner(memory_id: str) -> Optional[str]:
+    """user_id of a stored memory (None if it does not exist)"""
+    points = qdrant_client.retrieve(
+        collection_name=COLLECTION_NAME, ids=[memory_id], with_payload=["user_id"], with_vectors=False,
+    )
+    return (points[0].payload or {}).get("user_id") if points else None
+
+def sync_lexical_index(user_id: str, items: list, agent_id: Optional[str] = None, run_id: Optional[str] = None,
+                       metadata: Optional[dict] = None):
+    """Apply Mem0 add results (ADD / UPDATE / DELETE events) to the lexical index"""
+    for item in items:
+        memory_id = item.get("id")
+        if not memory_id:
+            continue
+        if item.get("event") == "DELETE":
+            lexical_index.remove(memory_id, user_id)
+        elif item.get("event") in ("ADD", "UPDATE"):
+            lexical_index.upsert(user_id, memory_id, item.get("memory", ""), memory_record(memory_id, {
+                **(metadata or {}),
+                "data": item.get("memory", ""),
+                "user_id": user_id,
+                "agent_id": agent_id,
+                "run_id": run_id,
+            }))
+
+# Background tagging pipeline - tags are generated after the memory is stored
+tag_worker = TagWorker(
+    apply_tags,
+    num_workers=int(os.getenv("TAG_WORKERS", 2)),
+    max_queue_size=int(os.getenv("TAG_QUEUE_SIZE", 1000)),
+)
+
+# --- Backend startup ---
+# Embedder + Qdrant and Neo4j initialise concurrently in the background.
+# Until the graph store is up, the API serves in vector-only mode.
+backend_manager = BackendManager()
+backend_manager.register("vector", init_vector_memory, retry_interval=float(os.getenv("VECTOR_RETRY_SECONDS", 10)))
+backend_manager.register("qdrant", lambda: qdrant_client.get_collections(), retry_interval=5)
+backend_manager.register(
+    "graph", init_graph_store, required=False,
+    retry_interval=float(os.getenv("GRAPH_RETRY_SECONDS", 30)),
+)
+if os.getenv("GRAPH_ENABLED", "true").lower() != "true":
+    backend_manager.disable("graph")
+
+@app.on_event("startup")
+def start_backends():
+    logger.info("🚀 Starting Mem0 initialization...")
+    backend_manager.start()
+    tag_worker.start()
+    add_coalescer.start()
+    if search_pipeline.reranker is not None:
+        search_pipeline.reranker.start()
+    if ingest_queue is not None:
+        ingest_queue.start()
+    memory_reaper.start()
+
+@app.on_event("shutdown")
+def stop_tag_worker():
+    # Queued jobs stay on disk for the next start; buffered adds are flushed,
+    # and their tagging jobs go to the tag worker
+    if ingest_queue is not None:
+        ingest_queue.stop()
+    add_coalescer.stop()
+    tag_worker.stop()
+    memory_reaper.stop()
+    if embedding_batcher is not None:
+        embedding_batcher.stop()
+    get_llm_client().close()
+    for pool in pools.values():
+        pool.shutdown()
+    stop_logging()
+
+async def run_in_pool(pool_name: str, fn, *args, **kwargs):
+    """Run blocking work in a bounded request pool, 503 when it is saturated"""
+    try:
+        return await pools[pool_name].run(fn, *args, **kwargs)
+    except BackendBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
 # Request/Response Models
 class AddMemoryRequest(BaseModel):
@@ -86,6 +441,23 @@ class AddMemoryRequest(BaseModel):
     agent_id: Optional[str] = None
     run_id: Optional[str] = None
     metadata: Optional[dict] = None
+    wait_for_tags: bool = False  # Generate tags inline instead of in the background
+    ttl_seconds: Optional[int] = None  # Expire the memory after this many seconds
+    coalesce: Optional[bool] = None  # Buffer with the conversation's other adds (default: on when configured)
+    queued: Optional[bool] = None  # Acknowledge with a job ID and add from the ingest queue (default: INGEST_QUEUE)
+
+class BatchAddItem(BaseModel):
+    messages: str
+    user_id: Optional[str] = "default_user"
+    agent_id: Optional[str] = None
+    run_id: Optional[str] = None
+    metadata: Optional[dict] = None
+    ttl_seconds: Optional[int] = None
+
+class AddMemoryBatchRequest(BaseModel):
+    items: List[BatchAddItem]
+    infer: bool = False  # Run Mem0 LLM fact extraction per item (slow, not batched)
+    generate_tags: bool = True
 
 class SearchMemoryRequest(BaseModel):
     query: str
@@ -93,6 +465,18 @@ class SearchMemoryRequest(BaseModel):
     agent_id: Optional[str] = None
     run_id: Optional[str] = None
     limit: int = 10
+    mode: str = "vector"  # "vector" or "hybrid" (BM25 + vector, reciprocal-rank fusion)
+    vector_weight: float = 1.0
+    bm25_weight: float = 1.0
+    rrf_k: int = 60
+    use_cache: bool = True  # False bypasses the search result cache
+    # Post-retrieval stages (oversample -> filter -> rerank -> min_score -> top-k)
+    filters: Optional[dict] = None  # Metadata equality filters, e.g. {"category": "work"}; a list matches any
+    tags: Optional[List[str]] = None  # Only memories with any of these tags
+    min_score: Optional[float] = None  # Drop results scoring below this (rerank score when reranked)
+    rerank: Optional[bool] = None  # Cross-encoder rerank (default RERANK_DEFAULT when RERANK_MODEL is set)
+    oversample: Optional[int] = None  # Candidates per result to retrieve (default SEARCH_OVERSAMPLE)
+    budget_ms: Optional[float] = None  # Latency budget; reranking is skipped when it would exceed it
 
 class UpdateMemoryRequest(BaseModel):
     memory_id: str
@@ -101,140 +485,151 @@ class UpdateMemoryRequest(BaseModel):
 class DeleteMemoryRequest(BaseModel):
     memory_id: str
 
+class FlushRequest(BaseModel):
+    conversation_id: Optional[str] = None  # Omit to flush every conversation
+
+class BulkDeleteRequest(BaseModel):
+    user_id: Optional[str] = None
+    agent_id: Optional[str] = None
+    run_id: Optional[str] = None
+    conversation_id: Optional[str] = None
+    tag: Optional[str] = None
+    older_than: Optional[str] = None  # ISO datetime: delete memories created before it
+    dry_run: bool = False  # Only count the matching memories
+
 # API Endpoints
 @app.get("/")
-def read_root():
+async def read_root():
     return {
         "message": "Mem0 Memory API",
         "version": "1.0.0",
         "endpoints": {
             "add": "/memory/add",
+            "add_batch": "/memory/add_batch",
             "search": "/memory/search",
             "get_all": "/memory/all",
             "update": "/memory/update",
             "delete": "/memory/delete",
-            "history": "/memory/history/{memory_id}"
+            "delete_bulk": "/memory/delete_bulk",
+            "flush": "/memory/flush",
+            "jobs": "/memory/jobs/{job_id}",
+            "history": "/memory/history/{memory_id}",
+            "health": "/health",
+            "ready": "/ready",
+            "metrics": "/metrics"
         }
     }
 
-# Tag Generation Function
-def generate_tags(text: str) -> list:
-    """Generate tags for a memory using LLM"""
-    try:
-        # Initialize OpenAI client with custom base URL
-        client = OpenAI(
-            api_key=os.getenv("LLM_API_KEY"),
-            base_url=os.getenv("LLM_BASE_URL", "https://tokenmind.abdul.in.th/v1")
-        )
-        
-        # Create prompt for tag generation
-        prompt = f"""Generate 2-4 short tags (single words) for this memory: "{text}"
+def resolve_conversation_id(request) -> str:
+    """🔧 Smart Conversation ID Detection"""
+    user_id = request.user_id
+    
+    # Priority 1: Check metadata for conversation_id
+    if request.metadata and "conversation_id" in request.metadata:
+        user_id = request.metadata["conversation_id"]
+        logger.debug(f"   ✅ Using conversation_id from metadata: {user_id}")
+    
+    # Priority 2: Use agent_id if available
+    elif request.agent_id and request.agent_id not in ["", "None", None]:
+        user_id = f"agent_{request.agent_id}"
+        logger.debug(f"   ✅ Using agent_id: {user_id}")
+    
+    # Priority 3: Use run_id if available
+    elif request.run_id and request.run_id not in ["", "None", None]:
+        user_id = f"run_{request.run_id}"
+        logger.debug(f"   ✅ Using run_id: {user_id}")
+    
+    # Priority 4: If Dify sends literal template, generate new conversation ID
+    elif user_id in ["{{sys.conversation_id}}", "{{conversation_id}}", None, ""]:
+        user_id = f"conv_{str(uuid.uuid4())[:8]}"
+        logger.info(f"   ⚠️  Generated new Conversation ID: {user_id}")
+    
+    return user_id
 
-Examples: work, food, sports, preference, tech, personal, travel, health
+@app.post("/memory/add")
+async def add_memory(request: AddMemoryRequest):
+    """Add a new memory with auto-generated tags"""
+    queued = request.queued if request.queued is not None else ingest_queue is not None
+    if queued and ingest_queue is not None:
+        return JSONResponse(status_code=202, content=await asyncio.to_thread(_enqueue_add, request))
+    return await run_in_pool("write", _add_memory, request)
 
-Return ONLY comma-separated tags, like: work, tech, personal
+def _enqueue_add(request: AddMemoryRequest) -> dict:
+    """Write an add to the ingest queue and acknowledge it with a job ID"""
+    user_id = resolve_conversation_id(request)
+    annotate(user_id=user_id)
+    job_id, duplicate = queue_add(request, user_id)
+    annotate(job_id=job_id, duplicate=duplicate)
+    return {
+        "status": "queued",
+        "job_id": job_id,
+        "duplicate": duplicate,
+        "conversation_id": user_id,
+        "status_url": f"/memory/jobs/{job_id}",
+    }
 
-Tags:"""
-        
-        # Call LLM with more tokens
-        response = client.chat.completions.create(
-            model=os.getenv("LLM_MODEL", "ptm-oss-120b"),
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=1500,
-            temperature=0.3
-        )
-        
-        # Parse response - check both content and reasoning_content
-        content = None
-        if hasattr(response, 'choices') and len(response.choices) > 0:
-            choice = response.choices[0]
-            if hasattr(choice, 'message'):
-                # Try content first
-                content = getattr(choice.message, 'content', None)
-                # If content is None, try reasoning_content
-                if not content:
-                    content = getattr(choice.message, 'reasoning_content', None)
-        
-        if not content:
-            print(f"Warning: LLM returned no content. Response: {response}")
-            return ["general"]
-            
-        tags_text = content.strip()
-        print(f"Tags text from LLM: {tags_text}")
-        
-        # Extract tags from response (handle various formats)
-        # Remove common prefixes
-        tags_text = tags_text.replace("Tags:", "").replace("tags:", "")
-        
-        # Clean and split tags
-        tags = [tag.strip().lower() for tag in re.split(r'[,;]', tags_text) if tag.strip()]
-        
-        # Filter and limit
-        tags = [t for t in tags if t and len(t) > 1 and len(t) < 20][:4]
-        
-        if not tags:
-            print(f"Warning: No valid tags from: {tags_text}")
-            return ["general"]
-            
-        print(f"✅ Generated tags: {tags}")
-        return tags
-        
-    except Exception as e:
-        print(f"❌ Tag generation error: {e}")
-        import traceback
-        traceback.print_exc()
-        return ["general"]
+def queue_add(request: AddMemoryRequest, user_id: str) -> tuple:
+    """Store an add as an ingest job; return (job_id, duplicate)"""
+    # Pin the resolved conversation so the job adds to the same one when it runs
+    payload = request.model_dump()
+    payload.update(user_id=user_id, queued=False, coalesce=False, metadata=dict(request.metadata or {}, conversation_id=user_id))
+    return ingest_queue.enqueue(payload, content_key(payload, ["messages", "user_id", "agent_id", "run_id"]))
 
-@app.post("/memory/add")
-def add_memory(request: AddMemoryRequest):
-    """Add a new memory with auto-generated tags"""
+def _process_queued_add(payload: dict):
+    return _add_memory(AddMemoryRequest(**payload))
+
+@app.get("/memory/jobs/{job_id}")
+async def get_ingest_job(job_id: str):
+    """Status of a queued add: queued, running, done (with its result) or failed"""
+    if ingest_queue is None:
+        raise HTTPException(status_code=404, detail="Ingest queue is disabled")
+    job = await asyncio.to_thread(ingest_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"status": "success", "data": job}
+
+def _add_memory(request: AddMemoryRequest):
+    memory = require_memory()
     try:
-        # 🔍 DEBUG: Log incoming request
-        print("=" * 80)
-        print("📥 INCOMING ADD MEMORY REQUEST from Dify:")
-        print(f"   Messages: {request.messages}")
-        print(f"   User ID: {request.user_id}")
-        print(f"   Agent ID: {request.agent_id}")
-        print(f"   Run ID: {request.run_id}")
-        print(f"   Metadata: {request.metadata}")
-        
-        # 🔧 Smart Conversation ID Detection
-        user_id = request.user_id
-        
-        # Priority 1: Check metadata for conversation_id
-        if request.metadata and "conversation_id" in request.metadata:
-            user_id = request.metadata["conversation_id"]
-            print(f"   ✅ Using conversation_id from metadata: {user_id}")
-        
-        # Priority 2: Use agent_id if available
-        elif request.agent_id and request.agent_id not in ["", "None", None]:
-            user_id = f"agent_{request.agent_id}"
-            print(f"   ✅ Using agent_id: {user_id}")
-        
-        # Priority 3: Use run_id if available
-        elif request.run_id and request.run_id not in ["", "None", None]:
-            user_id = f"run_{request.run_id}"
-            print(f"   ✅ Using run_id: {user_id}")
+        # 🔍 DEBUG: Sampled dump of the incoming request
+        if payload_sampled(logger):
+            logger.debug("📥 Add memory payload", extra={
+                "messages": clip(request.messages),
+                "user_id": request.user_id,
+                "agent_id": request.agent_id,
+                "run_id": request.run_id,
+                "metadata": clip(request.metadata),
+            })
         
-        # Priority 4: If Dify sends literal template, generate new conversation ID
-        elif user_id in ["{{sys.conversation_id}}", "{{conversation_id}}", None, ""]:
-            import uuid
-            user_id = f"conv_{str(uuid.uuid4())[:8]}"
-            print(f"   ⚠️  Generated new Conversation ID: {user_id}")
+        user_id = resolve_conversation_id(request)
+        annotate(user_id=user_id)
         
-        print("=" * 80)
+        # Coalescing: buffer the add and store it with the conversation's next ones
+        coalesce = request.coalesce if request.coalesce is not None else add_coalescer.enabled
+        if coalesce and add_coalescer.enabled and not request.wait_for_tags:
+            buffered = add_coalescer.submit((user_id, request.agent_id, request.run_id), request)
+            annotate(coalesced=buffered)
+            return {
+                "status": "buffered",
+                "data": {"results": []},
+                "tags": [],
+                "tags_status": "pending",
+                "conversation_id": user_id,
+                "buffered_messages": buffered,
+            }
         
-        # Generate tags from memory text
         memory_text = request.messages if isinstance(request.messages, str) else request.messages[0].get("content", "") if request.messages else ""
-        tags = generate_tags(memory_text)
-        
-        # Merge tags into metadata
         metadata = request.metadata or {}
+        
+        # Generate tags inline only when the caller asks for them,
+        # otherwise the tag worker patches them in after the add
+        tags = generate_tags(memory_text) if request.wait_for_tags else []
         metadata["tags"] = tags
         # Store the conversation_id in metadata for tracking
         metadata["conversation_id"] = user_id
+        expiry = expires_at(request.ttl_seconds or MEMORY_TTL_SECONDS)
+        if expiry:
+            metadata["expires_at"] = expiry
         
         result = memory.add(
             messages=request.messages,
@@ -243,79 +638,595 @@ def add_memory(request: AddMemoryRequest):
             run_id=request.run_id,
             metadata=metadata
         )
-        return {"status": "success", "data": result, "tags": tags, "conversation_id": user_id}
+        
+        items = result.get("results", []) if isinstance(result, dict) else (result or [])
+        sync_lexical_index(user_id, items, request.agent_id, request.run_id, metadata)
+        search_cache.invalidate_user(user_id)
+        
+        tags_status = "ready"
+        if not request.wait_for_tags:
+            memory_ids = [
+                item["id"] for item in items
+                if item.get("event") in ("ADD", "UPDATE") and item.get("id")
+            ]
+            tags_status = "pending" if tag_worker.submit(memory_ids, memory_text) else "skipped"
+        
+        return {
+            "status": "success",
+            "data": result,
+            "tags": tags,
+            "tags_status": tags_status,
+            "conversation_id": user_id,
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def flush_coalesced_adds(key: tuple, requests: List[AddMemoryRequest]):
+    """Store a conversation's buffered adds with one memory.add and one tagging job"""
+    user_id, agent_id, run_id = key
+    memory = require_memory()
+    memory_text = "\n".join(r.messages for r in requests)
+    metadata = {}
+    for r in requests:
+        metadata.update(r.metadata or {})
+    metadata.update(tags=[], conversation_id=user_id)
+    # The combined memory keeps the longest TTL (none if any add had none)
+    ttls = [r.ttl_seconds or MEMORY_TTL_SECONDS for r in requests]
+    expiry = expires_at(0 if not all(ttls) else max(ttls))
+    if expiry:
+        metadata["expires_at"] = expiry
+    
+    result = memory.add(
+        messages=memory_text,
+        user_id=user_id,
+        agent_id=agent_id,
+        run_id=run_id,
+        metadata=metadata
+    )
+    
+    items = result.get("results", []) if isinstance(result, dict) else (result or [])
+    sync_lexical_index(user_id, items, agent_id, run_id, metadata)
+    search_cache.invalidate_user(user_id)
+    memory_ids = [item["id"] for item in items if item.get("event") in ("ADD", "UPDATE") and item.get("id")]
+    tag_worker.submit(memory_ids, memory_text)
+    logger.info(f"🧺 Stored {len(requests)} coalesced adds", extra={"conversation_id": user_id, "results": len(items)})
+    return result
+
+# Opt-in durable ingest queue (INGEST_QUEUE=true): adds are written to a
+# SQLite WAL, acknowledged with a job ID and processed with retries
+ingest_queue = None
+if os.getenv("INGEST_QUEUE", "false").lower() == "true":
+    ingest_queue = IngestQueue(
+        os.getenv("INGEST_QUEUE_PATH", "ingest_queue.db"),
+        _process_queued_add,
+        num_workers=int(os.getenv("INGEST_WORKERS", 4)),
+        max_attempts=int(os.getenv("INGEST_MAX_ATTEMPTS", 5)),
+        retry_delay=float(os.getenv("INGEST_RETRY_SECONDS", 5)),
+        dedup_window=float(os.getenv("INGEST_DEDUP_SECONDS", 3600)),
+        lease=float(os.getenv("INGEST_LEASE_SECONDS", 60)),
+        # Hold jobs until Mem0 is up; a 503 (still starting) does not use up an attempt
+        ready=lambda timeout: backend_manager.wait("vector", timeout),
+        transient=lambda e: isinstance(e, HTTPException) and e.status_code == 503,
+    )
+
+def queue_coalesced_adds(key: tuple, requests: List[AddMemoryRequest]):
+    """Hand a conversation's buffered adds to the ingest queue after a failed flush"""
+    for r in requests:
+        queue_add(r, key[0])
+
+# Opt-in write coalescing (ADD_COALESCE_WINDOW_SECONDS > 0): adds to one
+# conversation are stored together after it has been quiet for the window.
+# Buffers are per process, so it is off with several workers: a conversation's
+# adds would be split across workers and /memory/flush would reach only one
+ADD_COALESCE_WINDOW_SECONDS = float(os.getenv("ADD_COALESCE_WINDOW_SECONDS", 0))
+if ADD_COALESCE_WINDOW_SECONDS > 0 and API_WORKERS > 1:
+    logger.warning("⚠️  Add coalescing is not supported with API_WORKERS > 1, ignoring ADD_COALESCE_WINDOW_SECONDS")
+    ADD_COALESCE_WINDOW_SECONDS = 0
+add_coalescer = AddCoalescer(
+    flush_coalesced_adds,
+    window=ADD_COALESCE_WINDOW_SECONDS,
+    max_messages=int(os.getenv("ADD_COALESCE_MAX_MESSAGES", 8)),
+    max_delay=float(os.getenv("ADD_COALESCE_MAX_DELAY_SECONDS", 30)),
+    num_workers=int(os.getenv("ADD_COALESCE_WORKERS", 2)),
+    max_retries=int(os.getenv("ADD_COALESCE_MAX_RETRIES", 3)),
+    retry_delay=float(os.getenv("ADD_COALESCE_RETRY_SECONDS", 5)),
+    # Acknowledged adds whose flush failed go to the durable queue when there is one
+    fallback=queue_coalesced_adds if ingest_queue is not None else None,
+)
+
+@app.post("/memory/flush")
+async def flush_memory(request: FlushRequest):
+    """Store buffered (coalesced) adds now, for one conversation or all of them"""
+    return await run_in_pool("write", _flush_memory, request)
+
+def _flush_memory(request: FlushRequest):
+    if request.conversation_id:
+        annotate(user_id=request.conversation_id)
+        results = add_coalescer.flush_matching(lambda key: key[0] == request.conversation_id)
+    else:
+        results = add_coalescer.flush_all()
+    flushed = []
+    for (user_id, agent_id, run_id), result in results.items():
+        entry = {"conversation_id": user_id, "agent_id": agent_id, "run_id": run_id}
+        if isinstance(result, Exception):
+            entry.update(status="error", error=str(result.detail if isinstance(result, HTTPException) else result))
+        else:
+            entry.update(status="success", data=result)
+        flushed.append(entry)
+    return {"status": "success", "flushed": flushed, "pending": add_coalescer.pending()}
+
+MAX_BATCH_ITEMS = int(os.getenv("ADD_BATCH_MAX_ITEMS", 1000))
+
+# Default TTL for new memories in seconds (0 = keep forever); ttl_seconds overrides it
+MEMORY_TTL_SECONDS = int(os.getenv("MEMORY_TTL_SECONDS", 0))
+
+@app.post("/memory/add_batch")
+async def add_memory_batch(request: AddMemoryBatchRequest):
+    """Add many memories in one call with batched embedding, tagging and upsert"""
+    return await run_in_pool("write", _add_memory_batch, request)
+
+def _add_memory_batch(request: AddMemoryBatchRequest):
+    memory = require_memory()
+    if len(request.items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch too large: {len(request.items)} items (max {MAX_BATCH_ITEMS})")
+    
+    annotate(items=len(request.items), infer=request.infer)
+    results = [None] * len(request.items)
+    pending = []  # (index, user_id, text)
+    for index, item in enumerate(request.items):
+        if not item.messages or not item.messages.strip():
+            results[index] = {"index": index, "status": "error", "error": "Empty messages"}
+            continue
+        pending.append((index, resolve_conversation_id(item), item.messages))
+    
+    # One multi-item prompt per chunk instead of one LLM call per item
+    texts = [text for _, _, text in pending]
+    all_tags = generate_tags_batch(texts) if request.generate_tags else [[] for _ in texts]
+    
+    if request.infer:
+        # Full Mem0 pipeline (fact extraction + update decisions) per item
+        for (index, user_id, text), tags in zip(pending, all_tags):
+            item = request.items[index]
+            metadata = dict(item.metadata or {}, tags=tags, conversation_id=user_id)
+            expiry = expires_at(item.ttl_seconds or MEMORY_TTL_SECONDS)
+            if expiry:
+                metadata["expires_at"] = expiry
+            try:
+                result = memory.add(
+                    messages=text,
+                    user_id=user_id,
+                    agent_id=item.agent_id,
+                    run_id=item.run_id,
+                    metadata=metadata
+                )
+                items = result.get("results", []) if isinstance(result, dict) else (result or [])
+                sync_lexical_index(user_id, items, item.agent_id, item.run_id, metadata)
+                search_cache.invalidate_user(user_id)
+                results[index] = {"index": index, "status": "success", "data": result, "tags": tags, "conversation_id": user_id}
+            except Exception as e:
+                results[index] = {"index": index, "status": "error", "error": str(e)}
+    else:
+        # Store items verbatim: one batched embed and one bulk upsert
+        try:
+            vectors = embed_texts(memory.embedding_model, texts)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Embedding failed: {e}")
+        
+        # Strictly increasing created_at (1 µs apart) keeps the batch in order
+        # and out of one huge timestamp tie for /memory/all paging
+        batch_started = datetime.now(pytz.timezone("US/Pacific"))
+        points = []
+        for offset, ((index, user_id, text), tags, vector) in enumerate(zip(pending, all_tags, vectors)):
+            created_at = (batch_started + timedelta(microseconds=offset)).isoformat()
+            item = request.items[index]
+            # Same payload layout Mem0 writes for a new memory
+            payload = dict(item.metadata or {})
+            payload.update({
+                "data": text,
+                "hash": hashlib.md5(text.encode()).hexdigest(),
+                "created_at": created_at,
+                "user_id": user_id,
+                "tags": tags,
+                "conversation_id": user_id,
+            })
+            if item.agent_id:
+                payload["agent_id"] = item.agent_id
+            if item.run_id:
+                payload["run_id"] = item.run_id
+            expiry = expires_at(item.ttl_seconds or MEMORY_TTL_SECONDS)
+            if expiry:
+                payload["expires_at"] = expiry
+            points.append(PointStruct(id=str(uuid.uuid4()), vector=vector, payload=payload))
+        
+        try:
+            if points:
+                qdrant_client.upsert(collection_name=COLLECTION_NAME, points=points, wait=True)
+            for (index, user_id, text), tags, point in zip(pending, all_tags, points):
+                lexical_index.upsert(user_id, point.id, text, memory_record(point.id, point.payload))
+                search_cache.invalidate_user(user_id)
+                results[index] = {
+                    "index": index,
+                    "status": "success",
+                    "data": {"results": [{"id": point.id, "memory": text, "event": "ADD"}]},
+                    "tags": tags,
+                    "conversation_id": user_id,
+                }
+        except Exception as e:
+            for index, _, _ in pending:
+                results[index] = {"index": index, "status": "error", "error": f"Upsert failed: {e}"}
+        else:
+            # Keep Mem0's history table in step with the direct upsert (only once it is stored)
+            db = getattr(memory, "db", None)
+            if db is not None and hasattr(db, "add_history"):
+                for point in points:
+                    try:
+                        db.add_history(point.id, None, point.payload["data"], "ADD", created_at=point.payload["created_at"])
+                    except Exception as e:
+                        logger.warning(f"⚠️  History write failed for {point.id}: {e}")
+    
+    succeeded = sum(1 for r in results if r["status"] == "success")
+    return {
+        "status": "success" if succeeded == len(results) else ("partial" if succeeded else "error"),
+        "data": {"results": results, "succeeded": succeeded, "failed": len(results) - succeeded},
+    }
+
+# Post-retrieval search stages; reranking needs RERANK_MODEL (e.g. BAAI/bge-reranker-v2-m3)
+RERANK_MODEL = os.getenv("RERANK_MODEL")
+search_pipeline = SearchPipeline(
+    reranker=CrossEncoderReranker(
+        RERANK_MODEL,
+        batch_size=int(os.getenv("RERANK_BATCH_SIZE", 16)),
+        max_length=int(os.getenv("RERANK_MAX_LENGTH", 512)),
+    ) if RERANK_MODEL else None,
+    oversample=int(os.getenv("SEARCH_OVERSAMPLE", 3)),
+    max_candidates=int(os.getenv("SEARCH_MAX_CANDIDATES", 100)),
+    budget_ms=float(os.getenv("SEARCH_BUDGET_MS", 0)),
+    rerank_budget_ms=float(os.getenv("RERANK_BUDGET_MS", 300)),
+    rerank_by_default=os.getenv("RERANK_DEFAULT", "false").lower() == "true",
+)
+
 @app.post("/memory/search")
-def search_memory(request: SearchMemoryRequest):
+async def search_memory(request: SearchMemoryRequest):
     """Search for relevant memories"""
+    # The latency budget includes time spent queued for the read pool
+    return await run_in_pool("read", _search_memory, request, time.perf_counter())
+
+def _search_memory(request: SearchMemoryRequest, started: float):
+    memory = require_memory()
     try:
-        # 🔍 DEBUG: Log incoming search request
-        print("🔎 SEARCH REQUEST from Dify:")
-        print(f"   Query: {request.query}")
-        print(f"   User ID: {request.user_id}")
-        print(f"   Limit: {request.limit}")
+        # 🔍 DEBUG: Sampled dump of the incoming search
+        if payload_sampled(logger):
+            logger.debug("🔎 Search payload", extra={
+                "query": clip(request.query), "user_id": request.user_id, "limit": request.limit,
+            })
         
         # 🔧 Fix: Handle literal template string
         user_id = request.user_id
         if user_id in ["{{sys.conversation_id}}", "{{conversation_id}}", None, ""]:
             # For search, we can't generate new ID, use default
             user_id = "default_user"
-            print(f"   ⚠️  Using default user_id for search: {user_id}")
+            logger.debug(f"   ⚠️  Using default user_id for search: {user_id}")
+        annotate(user_id=user_id, mode=request.mode)
+        
+        filters = dict(request.filters or {})
+        if request.tags:
+            filters["tags"] = request.tags
+        rerank = request.rerank if request.rerank is not None else search_pipeline.rerank_by_default
+        post_process = bool(filters) or request.min_score is not None or rerank
+        candidates = search_pipeline.candidates(request.limit, post_process, request.oversample)
+        
+        # Same user + parameters, and the same or a near-identical query
+        # (agent loops) -> answer from the search cache
+        use_cache = request.use_cache and search_cache.enabled
+        if use_cache:
+            cache_params = (request.agent_id, request.run_id, request.limit, request.mode,
+                            request.vector_weight, request.bm25_weight, request.rrf_k,
+                            json.dumps(filters, sort_keys=True, default=str), request.min_score, rerank,
+                            request.oversample)
+            cache_token = search_cache.token()
+            # Embedding up front is free only when the embedding cache makes
+            # Mem0's own embed of this query a hit; otherwise match exactly
+            semantic = search_cache.semantic and EMBED_CACHE_MB > 0
+            query_vector = memory.embedding_model.embed(request.query, "search") if semantic else None
+            cached = search_cache.get(user_id, cache_params, request.query, query_vector)
+            if cached is not None:
+                annotate(cache="hit")
+                return {"status": "success", "data": cached}
         
         results = memory.search(
             query=request.query,
             user_id=user_id,
             agent_id=request.agent_id,
             run_id=request.run_id,
-            limit=request.limit
+            limit=candidates
         )
+        
+        if request.mode == "hybrid":
+            vector_items = results.get("results", []) if isinstance(results, dict) else results
+            lexical_hits = lexical_index.search(
+                user_id, request.query, candidates,
+                predicate=lambda record: (
+                    (not request.agent_id or record.get("agent_id") == request.agent_id)
+                    and (not request.run_id or record.get("run_id") == request.run_id)
+                ),
+            )
+            fused = fuse_results(
+                vector_items, lexical_hits, candidates,
+                vector_weight=request.vector_weight,
+                bm25_weight=request.bm25_weight,
+                k=request.rrf_k,
+            )
+            results = dict(results, results=fused) if isinstance(results, dict) else fused
+        
+        degraded = False
+        if post_process:
+            items = results.get("results", []) if isinstance(results, dict) else results
+            items, report = search_pipeline.run(
+                request.query, items, request.limit,
+                filters=filters, min_score=request.min_score, rerank=rerank,
+                started=started, budget_ms=request.budget_ms,
+            )
+            annotate(pipeline=report)
+            degraded = report.get("rerank") in ("skipped_budget", "loading")
+            results = dict(results, results=items, pipeline=report) if isinstance(results, dict) else items
+        
+        # Results without the requested rerank are not cached
+        if use_cache and not degraded:
+            search_cache.put(user_id, cache_params, request.query, results, cache_token, query_vector)
         return {"status": "success", "data": results}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+MEMORY_PAGE_SIZE_MAX = int(os.getenv("MEMORY_PAGE_SIZE_MAX", 1000))
+
+# Past this many memories sharing the cursor's created_at, the cursor stops
+# listing their ids and counts them instead (Qdrant keeps ties in a stable order)
+CURSOR_MAX_TIES = 100
+
+def encode_cursor(created_at: str, ids: List[str], skipped: int = 0) -> str:
+    data = {"t": created_at, "n": skipped + len(ids)} if skipped or len(ids) > CURSOR_MAX_TIES else {"t": created_at, "ids": ids}
+    raw = json.dumps(data).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return {
+            "t": datetime.fromisoformat(data["t"]),
+            "raw_t": data["t"],
+            "ids": set(data.get("ids", [])),
+            "skip": int(data.get("n", 0)),
+        }
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @app.get("/memory/all")
-def get_all_memories(
+async def get_all_memories(
     user_id: Optional[str] = None,
     agent_id: Optional[str] = None,
-    run_id: Optional[str] = None
+    run_id: Optional[str] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    order: str = "desc",
+):
+    """Get all memories, one page at a time ordered by created_at"""
+    if not (user_id or agent_id or run_id):
+        raise HTTPException(status_code=400, detail="One of user_id, agent_id or run_id is required")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be 'asc' or 'desc'")
+    limit = min(max(limit, 1), MEMORY_PAGE_SIZE_MAX)
+    page_cursor = decode_cursor(cursor) if cursor else None
+    return await run_in_pool(
+        "read", _get_all_memories, user_id, agent_id, run_id, limit, page_cursor, include_total, order
+    )
+
+def _get_all_memories(
+    user_id: Optional[str],
+    agent_id: Optional[str],
+    run_id: Optional[str],
+    limit: int,
+    page_cursor: Optional[dict],
+    include_total: bool,
+    order: str,
 ):
-    """Get all memories"""
     try:
-        results = memory.get_all(
-            user_id=user_id,
-            agent_id=agent_id,
-            run_id=run_id
+        scroll_filter = build_admin_filter(user_id, agent_id, run_id)
+        skip_ids = page_cursor["ids"] if page_cursor else set()
+        skip_count = page_cursor["skip"] if page_cursor else 0
+        # Ordered scroll cannot use offsets, so resume from the last created_at
+        # (inclusive) and skip the memories already returned with that timestamp
+        points, _ = qdrant_client.scroll(
+            collection_name=COLLECTION_NAME,
+            scroll_filter=scroll_filter,
+            limit=limit + len(skip_ids) + skip_count + 1,
+            with_payload=True,
+            with_vectors=False,
+            order_by=OrderBy(
+                key="created_at",
+                direction=Direction.DESC if order == "desc" else Direction.ASC,
+                start_from=page_cursor["t"] if page_cursor else None,
+            ),
         )
-        return {"status": "success", "data": results}
+        points = [p for p in points if str(p.id) not in skip_ids]
+        if skip_count:
+            tied = [p for p in points if (p.payload or {}).get("created_at") == page_cursor["raw_t"]]
+            skipped = {str(p.id) for p in tied[:skip_count]}
+            points = [p for p in points if str(p.id) not in skipped]
+        has_more = len(points) > limit
+        points = points[:limit]
+        
+        results = []
+        for point in points:
+            payload = point.payload or {}
+            item = memory_record(point.id, payload)
+            results.append({k: v for k, v in item.items() if v is not None or k in ("metadata", "updated_at")})
+        
+        next_cursor = None
+        if has_more and points:
+            last_created_at = points[-1].payload.get("created_at")
+            same_time_ids = [str(p.id) for p in points if p.payload.get("created_at") == last_created_at]
+            skipped = 0
+            if page_cursor and page_cursor["raw_t"] == last_created_at:
+                same_time_ids += list(skip_ids)
+                skipped = skip_count
+            next_cursor = encode_cursor(last_created_at, same_time_ids, skipped)
+        
+        data = {"results": results, "next_cursor": next_cursor}
+        if include_total:
+            # Approximate count: an exact one is a full filtered scan on every page
+            data["total"] = qdrant_client.count(
+                collection_name=COLLECTION_NAME,
+                count_filter=scroll_filter,
+                exact=False,
+            ).count
+        if page_cursor is None and user_id and getattr(memory, "graph", None) is not None:
+            try:
+                data["relations"] = memory.graph.get_all({"user_id": user_id}, limit)
+            except Exception as e:
+                logger.warning(f"⚠️  Graph get_all failed: {e}")
+        return {"status": "success", "data": data}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.put("/memory/update")
-def update_memory(request: UpdateMemoryRequest):
+async def update_memory(request: UpdateMemoryRequest):
     """Update a memory"""
+    return await run_in_pool("write", _update_memory, request)
+
+def _update_memory(request: UpdateMemoryRequest):
+    memory = require_memory()
+    owner = None
     try:
+        owner = memory_owner(request.memory_id)
         result = memory.update(
             memory_id=request.memory_id,
             data=request.data
         )
+        lexical_index.update_text(request.memory_id, request.data)
         return {"status": "success", "data": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        search_cache.invalidate_user(owner)
 
 @app.delete("/memory/delete")
-def delete_memory(request: DeleteMemoryRequest):
+async def delete_memory(request: DeleteMemoryRequest):
     """Delete a memory"""
+    return await run_in_pool("write", _delete_memory, request)
+
+def _delete_memory(request: DeleteMemoryRequest):
+    memory = require_memory()
+    owner = None
     try:
+        owner = memory_owner(request.memory_id)
         result = memory.delete(memory_id=request.memory_id)
+        lexical_index.remove(request.memory_id, owner)
+        return {"status": "success", "data": result}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        search_cache.invalidate_user(owner)
+
+DELETE_BATCH_SIZE = int(os.getenv("DELETE_BATCH_SIZE", 500))
+
+def purge_memories(scroll_filter: Filter, max_points: Optional[int] = None) -> dict:
+    """Delete every memory matching a filter and bring derived state in line.
+
+    Qdrant points go in batches; each batch is removed from the lexical
+    index and recorded in Mem0's history. Afterwards the affected users'
+    search cache is dropped, and users left with no memories have their
+    Neo4j graph deleted too (graph nodes are per user, not per memory).
+    """
+    memory = require_memory()
+    db = getattr(memory, "db", None)
+    users = set()
+    
+    def on_batch(points):
+        for point in points:
+            payload = point.payload or {}
+            user_id = payload.get("user_id")
+            users.add(user_id)
+            lexical_index.remove(str(point.id), user_id)
+            if db is not None and hasattr(db, "add_history"):
+                try:
+                    db.add_history(str(point.id), payload.get("data"), None, "DELETE", is_deleted=1)
+                except Exception as e:
+                    logger.warning(f"⚠️  History write failed for {point.id}: {e}")
+    
+    try:
+        deleted = delete_in_batches(
+            qdrant_client, COLLECTION_NAME, scroll_filter, on_batch,
+            batch_size=DELETE_BATCH_SIZE, max_points=max_points,
+        )
+    finally:
+        for user_id in users:
+            search_cache.invalidate_user(user_id)
+    
+    graph_users_cleared = 0
+    graph = getattr(memory, "graph", None) if getattr(memory, "enable_graph", False) else None
+    for user_id in filter(None, users):
+        if graph is None:
+            break
+        user_filter = Filter(must=[FieldCondition(key="user_id", match=MatchValue(value=user_id))])
+        if qdrant_client.count(collection_name=COLLECTION_NAME, count_filter=user_filter, exact=True).count:
+            continue
+        try:
+            graph.delete_all({"user_id": user_id})
+            graph_users_cleared += 1
+        except Exception as e:
+            logger.warning(f"⚠️  Graph cleanup failed for {user_id}: {e}")
+    
+    return {"deleted": deleted, "users": len(users), "graph_users_cleared": graph_users_cleared}
+
+@app.post("/memory/delete_bulk")
+async def delete_memories_bulk(request: BulkDeleteRequest):
+    """Delete every memory matching a filter (user, agent, run, conversation, tag, age)"""
+    return await run_in_pool("write", _delete_memories_bulk, request)
+
+def _delete_memories_bulk(request: BulkDeleteRequest):
+    require_memory()
+    scroll_filter = build_admin_filter(
+        user_id=request.user_id,
+        agent_id=request.agent_id,
+        run_id=request.run_id,
+        conversation_id=request.conversation_id,
+        tag=request.tag,
+        created_before=request.older_than,
+    )
+    if scroll_filter is None:
+        raise HTTPException(status_code=400, detail="At least one filter is required")
+    try:
+        if request.dry_run:
+            matched = qdrant_client.count(collection_name=COLLECTION_NAME, count_filter=scroll_filter, exact=True).count
+            return {"status": "success", "data": {"matched": matched, "dry_run": True}}
+        result = purge_memories(scroll_filter)
+        logger.info(f"🗑️  Bulk delete removed {result['deleted']} memories of {result['users']} user(s)")
         return {"status": "success", "data": result}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def reap_expired_memories() -> int:
+    """One reaper pass: delete memories whose expires_at has passed"""
+    if memory is None:
+        return 0
+    return purge_memories(expired_filter(), max_points=REAPER_MAX_PER_RUN)["deleted"]
+
+# Background expiry of memories with a TTL (REAPER_INTERVAL_SECONDS=0 disables)
+REAPER_MAX_PER_RUN = int(os.getenv("REAPER_MAX_PER_RUN", 10000))
+memory_reaper = MemoryReaper(reap_expired_memories, interval=float(os.getenv("REAPER_INTERVAL_SECONDS", 300)))
+
 @app.get("/memory/history/{memory_id}")
-def get_memory_history(memory_id: str):
+async def get_memory_history(memory_id: str):
     """Get history of a memory"""
+    return await run_in_pool("read", _get_memory_history, memory_id)
+
+def _get_memory_history(memory_id: str):
+    memory = require_memory()
     try:
         result = memory.history(memory_id=memory_id)
         return {"status": "success", "data": result}
@@ -323,29 +1234,127 @@ def get_memory_history(memory_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/health")
-def health_check():
-    """Health check endpoint"""
+async def health_check():
+    """Liveness probe - the process is up and serving"""
     return {"status": "healthy"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe - per-backend status, 503 until the required backends are up"""
+    readiness = backend_manager.readiness()
+    readiness["mode"] = "graph" if backend_manager.is_ready("graph") else "vector-only"
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content=readiness)
+
 # --- Admin Endpoints for Dashboard ---
-from qdrant_client import QdrantClient
+def runtime_stats() -> dict:
+    """LLM connection pool, executors, caches and background queues"""
+    return {
+        "llm": get_llm_client().stats(),
+        "tag_queue": {"pending": tag_worker.pending},
+        "add_coalescing": add_coalescer.stats(),
+        "ingest_queue": ingest_queue.stats() if ingest_queue else None,
+        "tag_cache": tag_cache.stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "lexical_index": lexical_index.stats(),
+        "search_cache": search_cache.stats(),
+        "search_pipeline": search_pipeline.stats(),
+        "memory_reaper": memory_reaper.stats(),
+        "logging": logging_stats(),
+        "embedding_batcher": embedding_batcher.stats() if embedding_batcher else None,
+        **executor_stats(),
+    }
 
-# Initialize Qdrant Client for Admin operations
-qdrant_client = QdrantClient(
-    host=os.getenv("QDRANT_HOST", "localhost"),
-    port=int(os.getenv("QDRANT_PORT", 6333))
-)
+install_runtime_collector(runtime_stats)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint"""
+    # The runtime collector reads the ingest queue's SQLite file: keep it off the event loop
+    body, content_type = await asyncio.to_thread(render_metrics)
+    return Response(content=body, media_type=content_type)
+
+@app.get("/admin/stats")
+async def get_admin_stats():
+    """Runtime stats: LLM connection pool, executors and background queues"""
+    return {"status": "success", "data": await asyncio.to_thread(runtime_stats)}
+
+# Payload indexes backing the admin filters below
+ADMIN_PAYLOAD_INDEXES = {
+    "user_id": PayloadSchemaType.KEYWORD,
+    "agent_id": PayloadSchemaType.KEYWORD,
+    "run_id": PayloadSchemaType.KEYWORD,
+    "tags": PayloadSchemaType.KEYWORD,
+    "created_at": PayloadSchemaType.DATETIME,
+    "conversation_id": PayloadSchemaType.KEYWORD,
+    "expires_at": PayloadSchemaType.DATETIME,
+    "data": TextIndexParams(
+        type=TextIndexType.TEXT,
+        tokenizer=TokenizerType.PREFIX,
+        min_token_len=1,
+        max_token_len=20,
+        lowercase=True,
+    ),
+}
+
+def create_payload_indexes():
+    """Create the Qdrant payload indexes used by admin filtering (idempotent)"""
+    for field_name, field_schema in ADMIN_PAYLOAD_INDEXES.items():
+        try:
+            qdrant_client.create_payload_index(
+                collection_name=COLLECTION_NAME,
+                field_name=field_name,
+                field_schema=field_schema,
+            )
+        except Exception as e:
+            logger.warning(f"⚠️  Could not create payload index on '{field_name}': {e}")
+
+# Memory-format key -> payload field it is built from
+ADMIN_FIELD_SOURCES = {
+    "memory": "data",
+    "user_id": "user_id",
+    "agent_id": "agent_id",
+    "run_id": "run_id",
+    "metadata": "metadata",
+    "created_at": "created_at",
+    "updated_at": "updated_at",
+    "hash": "hash",
+}
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Parse a comma-separated field list into payload keys ("memory" means "data")"""
+    if not fields:
+        return None
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    payload_keys = {ADMIN_FIELD_SOURCES.get(name, name) for name in names}
+    if "metadata" in payload_keys:
+        payload_keys.add("tags")
+    return sorted(payload_keys)
 
 @app.get("/admin/memories")
-def get_all_memories_admin(limit: int = 100, offset: Optional[str] = None):
+async def get_all_memories_admin(
+    limit: int = 100,
+    offset: Optional[str] = None,
+    user_id: Optional[str] = None,
+    agent_id: Optional[str] = None,
+    run_id: Optional[str] = None,
+    tag: Optional[str] = None,
+    created_after: Optional[str] = None,
+    created_before: Optional[str] = None,
+    text: Optional[str] = None,
+    fields: Optional[str] = None,
+):
     """Admin endpoint to fetch all memories directly from Qdrant"""
+    scroll_filter = build_admin_filter(user_id, agent_id, run_id, tag, created_after, created_before, text)
+    return await run_in_pool("admin", _get_all_memories_admin, limit, offset, scroll_filter, parse_fields(fields))
+
+def _get_all_memories_admin(limit: int, offset: Optional[str], scroll_filter: Optional[Filter], payload_fields: Optional[List[str]]):
     try:
         response = qdrant_client.scroll(
-            collection_name="mem0",
+            collection_name=COLLECTION_NAME,
             limit=limit,
-            with_payload=True,
+            with_payload=payload_fields if payload_fields else True,
             with_vectors=False,
-            scroll_filter=None,
+            scroll_filter=scroll_filter,
             offset=offset
         )
         
@@ -362,7 +1371,7 @@ def get_all_memories_admin(limit: int = 100, offset: Optional[str] = None):
                 metadata["tags"] = payload["tags"]
             
             # Map Qdrant payload to Memory format
-            results.append({
+            record = {
                 "id": str(point.id),
                 "memory": payload.get("data", ""), # 'data' contains the memory text
                 "user_id": payload.get("user_id", "unknown"),
@@ -372,14 +1381,146 @@ def get_all_memories_admin(limit: int = 100, offset: Optional[str] = None):
                 "created_at": payload.get("created_at"),
                 "updated_at": payload.get("updated_at"),
                 "hash": payload.get("hash")
-            })
+            }
+            if payload_fields:
+                # Only return the fields that were asked for
+                record = {
+                    key: value for key, value in record.items()
+                    if key == "id" or ADMIN_FIELD_SOURCES[key] in payload_fields
+                }
+            results.append(record)
             
         return {"status": "success", "data": {"results": results, "next_cursor": next_page_offset}}
 
     except Exception as e:
-        print(f"Admin fetch error: {e}")
+        logger.exception(f"Admin fetch error: {e}")
         # Return empty list on error to prevent dashboard crash
         return {"status": "error", "data": {"results": []}, "message": str(e)}
 
+def build_admin_filter(
+    user_id: Optional[str] = None,
+    agent_id: Optional[str] = None,
+    run_id: Optional[str] = None,
+    tag: Optional[str] = None,
+    created_after: Optional[str] = None,
+    created_before: Optional[str] = None,
+    text: Optional[str] = None,
+    conversation_id: Optional[str] = None,
+) -> Optional[Filter]:
+    """Translate admin query parameters into a Qdrant payload filter"""
+    conditions = [
+        FieldCondition(key=key, match=MatchValue(value=value))
+        for key, value in (
+            ("user_id", user_id), ("agent_id", agent_id), ("run_id", run_id),
+            ("conversation_id", conversation_id), ("tags", tag),
+        )
+        if value
+    ]
+    if created_after or created_before:
+        try:
+            # created_before / older_than are exclusive: "created before" the cutoff
+            created_range = DatetimeRange(gte=created_after, lt=created_before)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid created_after/created_before: {e}")
+        conditions.append(FieldCondition(key="created_at", range=created_range))
+    if text:
+        # Word-prefix match on the memory text (prefix-tokenised full-text index)
+        conditions.append(FieldCondition(key="data", match=MatchText(text=text)))
+    return Filter(must=conditions) if conditions else None
+
+def export_page(scroll_filter, fields: Optional[List[str]], batch_size: int, offset: Optional[str], with_vectors: bool):
+    """Scroll one page and render it as NDJSON; return (text, next offset)"""
+    points, offset = qdrant_client.scroll(
+        collection_name=COLLECTION_NAME,
+        scroll_filter=scroll_filter,
+        limit=batch_size,
+        offset=offset,
+        with_payload=fields if fields else True,
+        with_vectors=with_vectors,
+    )
+    lines = []
+    for point in points:
+        record = {"id": str(point.id), "payload": point.payload or {}}
+        if with_vectors:
+            record["vector"] = point.vector
+        lines.append(json.dumps(record, ensure_ascii=False, default=str))
+    return lines, offset
+
+async def export_memories(scroll_filter, fields: Optional[List[str]], batch_size: int, cursor: Optional[str], with_vectors: bool):
+    """Walk the Qdrant scroll cursor and yield NDJSON lines, one admin-pool call per page.
+
+    After every page a ``{"_cursor": ...}`` line records where to resume;
+    the stream ends with ``{"_cursor": null, "_done": true}``.
+    """
+    # Fetch the first page before the response starts, so a busy pool or a bad filter is a plain HTTP error
+    lines, offset = await run_in_pool("admin", export_page, scroll_filter, fields, batch_size, cursor, with_vectors)
+    exported = 0
+
+    async def pages(lines, offset):
+        nonlocal exported
+        while True:
+            exported += len(lines)
+            if offset is None:
+                lines.append(json.dumps({"_cursor": None, "_done": True, "_exported": exported}))
+                yield "\n".join(lines) + "\n"
+                return
+            lines.append(json.dumps({"_cursor": str(offset)}))
+            yield "\n".join(lines) + "\n"
+            try:
+                lines, offset = await run_in_pool("admin", export_page, scroll_filter, fields, batch_size, offset, with_vectors)
+            except Exception as e:
+                logger.exception(f"Admin export error: {e}")
+                yield json.dumps({"_error": str(getattr(e, "detail", None) or e), "_exported": exported}) + "\n"
+                return
+
+    return pages(lines, offset)
+
+async def gzip_stream(chunks):
+    """Gzip a stream of text chunks incrementally"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+@app.get("/admin/memories/export")
+async def export_memories_admin(
+    user_id: Optional[str] = None,
+    agent_id: Optional[str] = None,
+    run_id: Optional[str] = None,
+    tag: Optional[str] = None,
+    created_after: Optional[str] = None,
+    created_before: Optional[str] = None,
+    text: Optional[str] = None,
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    batch_size: int = 500,
+    vectors: bool = False,
+    gzip: bool = False,
+):
+    """Stream every matching memory as NDJSON (optionally gzip), resumable from a cursor"""
+    scroll_filter = build_admin_filter(user_id, agent_id, run_id, tag, created_after, created_before, text)
+    try:
+        stream = await export_memories(scroll_filter, parse_fields(fields), min(max(batch_size, 1), 5000), cursor, vectors)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"Admin export error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if gzip:
+        return StreamingResponse(
+            gzip_stream(stream),
+            media_type="application/gzip",
+            headers={"Content-Disposition": "attachment; filename=mem0-export.ndjson.gz"},
+        )
+    return StreamingResponse(stream, media_type="application/x-ndjson")
+
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    workers = API_WORKERS
+    if workers > 1 and not EMBEDDING_SERVER_URL:
+        logger.warning("⚠️  API_WORKERS > 1 without EMBEDDING_SERVER_URL: every worker loads its own embedding model")
+    if workers > 1 and QDRANT_PATH:
+        logger.warning("⚠️  QDRANT_PATH is per process: use a Qdrant server with API_WORKERS > 1")
+    # A single worker serves this module's app; an import string would load the module again as "main"
+    uvicorn.run(app if workers == 1 else "main:app", host="0.0.0.0", port=int(os.getenv("API_PORT", 8000)), workers=workers)
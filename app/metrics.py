@@ -0,0 +1,166 @@
+"""
+Prometheus metrics for the memory API (served at GET /metrics).
+
+Recorded as they happen:
+- ``mem0_http_requests_total`` / ``mem0_http_request_duration_seconds``
+  per method, route template and status;
+- ``mem0_stage_duration_seconds`` per stage (embed, llm, vector, graph,
+  tagging) and operation (search, upsert, scroll, add, generate_tags, ...),
+  fed by the same stage timings the request log reports.
+
+Read from the runtime stats on every scrape (``RuntimeCollector``): backend
+and pool concurrency, LLM calls and token usage, cache hits and misses,
+tag queue depth and dropped log records.
+
+With several API workers, set PROMETHEUS_MULTIPROC_DIR so the recorded
+metrics are aggregated across workers; the runtime gauges always come from
+the worker that answers the scrape.
+"""
+import os
+from typing import Callable
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from request_log import add_stage_observer
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+HTTP_REQUESTS = Counter(
+    "mem0_http_requests_total", "HTTP requests", ["method", "route", "status"],
+)
+HTTP_LATENCY = Histogram(
+    "mem0_http_request_duration_seconds", "HTTP request latency", ["method", "route"], buckets=LATENCY_BUCKETS,
+)
+HTTP_IN_FLIGHT = Gauge(
+    "mem0_http_requests_in_flight", "HTTP requests being served", multiprocess_mode="livesum",
+)
+STAGE_LATENCY = Histogram(
+    "mem0_stage_duration_seconds", "Time spent per backend stage and operation", ["stage", "operation"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+def observe_request(method: str, route: str, status: int, seconds: float):
+    HTTP_REQUESTS.labels(method, route, str(status)).inc()
+    HTTP_LATENCY.labels(method, route).observe(seconds)
+
+
+def _observe_stage(stage: str, ms: float, operation=None):
+    STAGE_LATENCY.labels(stage, operation or "").observe(ms / 1000.0)
+
+
+add_stage_observer(_observe_stage)
+
+
+class RuntimeCollector:
+    """Expose the /admin/stats runtime numbers as Prometheus metrics"""
+
+    def __init__(self, get_stats: Callable[[], dict]):
+        self.get_stats = get_stats
+
+    def collect(self):
+        stats = self.get_stats()
+
+        active = GaugeMetricFamily("mem0_backend_active", "Backend calls in progress", labels=["backend"])
+        waiting = GaugeMetricFamily("mem0_backend_queue_depth", "Calls waiting for a backend slot", labels=["backend"])
+        calls = CounterMetricFamily("mem0_backend_calls", "Completed backend calls", labels=["backend"])
+        for name, backend in stats.get("backends", {}).items():
+            active.add_metric([name], backend["active"])
+            waiting.add_metric([name], backend["queue_depth"])
+            calls.add_metric([name], backend["completed"])
+        yield from (active, waiting, calls)
+
+        running = GaugeMetricFamily("mem0_pool_running", "Requests running in a pool", labels=["pool"])
+        queued = GaugeMetricFamily("mem0_pool_queue_depth", "Requests queued for a pool", labels=["pool"])
+        rejected = CounterMetricFamily("mem0_pool_rejected", "Requests rejected with 503", labels=["pool"])
+        for name, pool in stats.get("pools", {}).items():
+            running.add_metric([name], pool["running"])
+            queued.add_metric([name], pool["queue_depth"])
+            rejected.add_metric([name], pool["rejected"])
+        yield from (running, queued, rejected)
+
+        llm = stats.get("llm") or {}
+        if llm:
+            yield GaugeMetricFamily("mem0_llm_in_flight", "LLM calls in progress", value=llm["in_flight"])
+            yield CounterMetricFamily("mem0_llm_calls", "LLM calls made", value=llm["total_calls"])
+            yield CounterMetricFamily("mem0_llm_failed_calls", "LLM calls that failed", value=llm["failed_calls"])
+            tokens = CounterMetricFamily("mem0_llm_tokens", "LLM tokens used", labels=["type"])
+            tokens.add_metric(["prompt"], llm.get("prompt_tokens", 0))
+            tokens.add_metric(["completion"], llm.get("completion_tokens", 0))
+            yield tokens
+
+        hits = CounterMetricFamily("mem0_cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("mem0_cache_misses", "Cache misses", labels=["cache"])
+        ratio = GaugeMetricFamily("mem0_cache_hit_ratio", "Cache hit ratio since start", labels=["cache"])
+        entries = GaugeMetricFamily("mem0_cache_entries", "Entries held in a cache", labels=["cache"])
+        for name in ("tag_cache", "embedding_cache", "search_cache"):
+            cache = stats.get(name)
+            if not cache:
+                continue
+            cache_hits = cache.get("hits", cache.get("exact_hits", 0) + cache.get("semantic_hits", 0))
+            hits.add_metric([name], cache_hits)
+            misses.add_metric([name], cache["misses"])
+            ratio.add_metric([name], cache["hit_rate"])
+            entries.add_metric([name], cache.get("entries", cache.get("size", 0)))
+        yield from (hits, misses, ratio, entries)
+
+        tag_queue = stats.get("tag_queue") or {}
+        yield GaugeMetricFamily("mem0_tag_queue_pending", "Tagging jobs waiting", value=tag_queue.get("pending", 0))
+        coalescing = stats.get("add_coalescing") or {}
+        yield GaugeMetricFamily("mem0_add_coalescer_pending", "Adds buffered for coalescing",
+                                value=coalescing.get("pending", 0))
+        yield CounterMetricFamily("mem0_add_coalescer_failed_flushes", "Coalesced flushes that failed",
+                                  value=coalescing.get("failed_flushes", 0))
+        yield CounterMetricFamily("mem0_add_coalescer_handed_off", "Adds handed to the ingest queue after a failed flush",
+                                  value=coalescing.get("handed_off", 0))
+        yield CounterMetricFamily("mem0_add_coalescer_dropped", "Buffered adds dropped after all retries failed",
+                                  value=coalescing.get("dropped_items", 0))
+        ingest = stats.get("ingest_queue")
+        if ingest:
+            jobs = GaugeMetricFamily("mem0_ingest_jobs", "Ingest queue jobs by status", labels=["status"])
+            for status in ("queued", "running", "done", "failed"):
+                jobs.add_metric([status], ingest[status])
+            yield jobs
+            yield CounterMetricFamily("mem0_ingest_retries", "Ingest job retries", value=ingest["retried"])
+        batcher = stats.get("embedding_batcher")
+        if batcher:
+            yield GaugeMetricFamily("mem0_embedding_batch_size_avg", "Average embedding batch size",
+                                    value=batcher["avg_batch_size"])
+        logging_stats = stats.get("logging") or {}
+        yield CounterMetricFamily("mem0_log_records_dropped", "Log records dropped (queue full)",
+                                  value=logging_stats.get("dropped", 0))
+
+
+_runtime_collector = None
+
+
+def install_runtime_collector(get_stats: Callable[[], dict]):
+    """Register the runtime collector once (main.py may be imported twice, as __main__ and main)"""
+    global _runtime_collector
+    if _runtime_collector is not None:
+        _runtime_collector.get_stats = get_stats
+        return
+    _runtime_collector = RuntimeCollector(get_stats)
+    REGISTRY.register(_runtime_collector)
+
+
+def render_metrics():
+    """Return (body, content type) for the /metrics response"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        if _runtime_collector is not None:
+            registry.register(_runtime_collector)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
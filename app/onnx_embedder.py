@@ -0,0 +1,129 @@
+"""
+ONNX Runtime embedder (EMBEDDING_PROVIDER=onnx).
+
+Runs an ONNX export of the embedding model on CPU, optionally with int8
+dynamic quantisation. The export is produced once with Hugging Face
+Optimum and cached under ONNX_MODEL_DIR; serving only needs onnxruntime
+and the tokenizer.
+
+Optional dependencies:
+    pip install "optimum[onnxruntime]"     # export + quantisation (first run)
+    pip install onnxruntime                # serving
+"""
+import logging
+import os
+import re
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class OnnxEmbedding:
+    """Mem0-compatible embedder backed by an ONNX Runtime session.
+
+    Exposes ``embed(text, memory_action)`` like Mem0's embedders and a
+    SentenceTransformer-style ``encode`` (via ``self.model``), so the
+    embedding batcher and ``embed_texts`` batch it the same way.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "BAAI/bge-m3",
+        model_dir: str = "/data/onnx",
+        quantize: bool = True,
+        pooling: str = "cls",
+        max_length: int = 512,
+        threads: Optional[int] = None,
+    ):
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        self.pooling = pooling
+        self.max_length = max_length
+        self.model = self  # SentenceTransformer-style access: embedder.model.encode(...)
+
+        export_dir = export_model(model_name, model_dir, quantize)
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(export_dir, "model_quantized.onnx" if quantize else "model.onnx"),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(export_dir)
+
+    def encode(self, texts, batch_size: Optional[int] = None, convert_to_numpy: bool = True, **kwargs):
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        batch_size = batch_size or 32
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            outputs.append(self._encode_batch(texts[start:start + batch_size]))
+        vectors = np.concatenate(outputs) if outputs else np.zeros((0, 0), dtype=np.float32)
+        return vectors[0] if single else vectors
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        tokens = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=self.max_length, return_tensors="np"
+        )
+        inputs = {name: tokens[name].astype(np.int64) for name in tokens if name in self.input_names}
+        hidden = self.session.run(None, inputs)[0]  # last_hidden_state: (batch, seq, dim)
+        if self.pooling == "mean":
+            mask = tokens["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        else:
+            pooled = hidden[:, 0]
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+    def embed(self, text, memory_action=None) -> List[float]:
+        return self.encode([text])[0].tolist()
+
+
+def export_model(model_name: str, model_dir: str, quantize: bool) -> str:
+    """Export (and optionally int8-quantise) the model once; return its directory"""
+    export_dir = os.path.join(model_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", model_name))
+    onnx_file = os.path.join(export_dir, "model_quantized.onnx" if quantize else "model.onnx")
+    if os.path.exists(onnx_file):
+        return export_dir
+
+    try:
+        from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        from transformers import AutoTokenizer
+    except ImportError:
+        raise RuntimeError(
+            "EMBEDDING_PROVIDER=onnx needs an exported model. Install optimum[onnxruntime] "
+            f"to export {model_name}, or place model.onnx/model_quantized.onnx in {export_dir}"
+        )
+
+    logger.info(f"📦 Exporting {model_name} to ONNX in {export_dir}...")
+    if not os.path.exists(os.path.join(export_dir, "model.onnx")):
+        ORTModelForFeatureExtraction.from_pretrained(model_name, export=True).save_pretrained(export_dir)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(export_dir)
+    if quantize:
+        logger.info("📦 Applying int8 dynamic quantisation...")
+        quantizer = ORTQuantizer.from_pretrained(export_dir, file_name="model.onnx")
+        quantizer.quantize(
+            save_dir=export_dir,
+            quantization_config=AutoQuantizationConfig.avx2(is_static=False, per_channel=False),
+        )
+    return export_dir
+
+
+def onnx_embedder_from_env() -> OnnxEmbedding:
+    """Build the ONNX embedder from environment settings"""
+    threads = os.getenv("ONNX_THREADS")
+    return OnnxEmbedding(
+        model_name=os.getenv("EMBEDDING_MODEL", "BAAI/bge-m3"),
+        model_dir=os.getenv("ONNX_MODEL_DIR", "/data/onnx"),
+        quantize=os.getenv("ONNX_QUANTIZE", "true").lower() == "true",
+        pooling=os.getenv("ONNX_POOLING", "cls"),
+        threads=int(threads) if threads else None,
+    )
@@ -0,0 +1,227 @@
+"""
+Structured, non-blocking logging with request context.
+
+``setup_logging`` routes every log record through a bounded queue to one
+background writer thread, so request threads never block on stdout (or
+the Docker log driver behind it); records are dropped and counted when
+the queue is full. Output is JSON lines (``LOG_FORMAT=json``) or plain
+text, at ``LOG_LEVEL``.
+
+Each request gets an ID (``X-Request-ID`` or a new one) and a
+``RequestTrace`` held in context variables. Log records carry the request
+ID; backend calls add their time to the trace's stages (embed, llm,
+vector, graph, tagging) and handlers ``annotate`` it with fields such as
+the user ID. The access log line reports both.
+
+Debug payload dumps (message text, queries) are sampled with
+``LOG_PAYLOAD_SAMPLE_RATE`` and truncated to ``LOG_PAYLOAD_MAX_CHARS``.
+"""
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Dict, Optional
+
+_request_id: contextvars.ContextVar = contextvars.ContextVar("request_id", default=None)
+_trace: contextvars.ContextVar = contextvars.ContextVar("trace", default=None)
+
+PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", 0.01))
+PAYLOAD_MAX_CHARS = int(os.getenv("LOG_PAYLOAD_MAX_CHARS", 200))
+
+# Attributes every LogRecord has; anything else came in through ``extra=``
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+
+class RequestTrace:
+    """Milliseconds per stage and annotated fields of one request (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.timings: Dict[str, float] = {}
+        self.fields: Dict[str, object] = {}
+
+    def add(self, name: str, ms: float):
+        with self._lock:
+            self.timings[name] = self.timings.get(name, 0.0) + ms
+
+    def stages(self) -> Dict[str, float]:
+        with self._lock:
+            return {name: round(ms, 1) for name, ms in self.timings.items()}
+
+
+def start_request(request_id: str) -> RequestTrace:
+    """Bind a request ID and a fresh trace to the current context"""
+    trace = RequestTrace()
+    _request_id.set(request_id)
+    _trace.set(trace)
+    return trace
+
+
+_stage_observers = []
+
+
+def add_stage_observer(observer):
+    """Also report every stage timing to ``observer(stage, ms, operation)`` (e.g. metrics)"""
+    _stage_observers.append(observer)
+
+
+def record_stage(name: str, ms: float, operation: Optional[str] = None):
+    trace = _trace.get()
+    if trace is not None:
+        trace.add(name, ms)
+    for observer in _stage_observers:
+        observer(name, ms, operation)
+
+
+def annotate(**fields):
+    """Attach fields (user_id, result counts, ...) to the current request's access log"""
+    trace = _trace.get()
+    if trace is not None:
+        trace.fields.update(fields)
+
+
+@contextmanager
+def stage(name: str, operation: Optional[str] = None):
+    """Time a block and add it to the current request's ``name`` stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, (time.perf_counter() - start) * 1000.0, operation)
+
+
+def payload_sampled(logger: logging.Logger) -> bool:
+    """True when this request's payload should be dumped at debug level"""
+    return logger.isEnabledFor(logging.DEBUG) and random.random() < PAYLOAD_SAMPLE_RATE
+
+
+def clip(value, max_chars: int = None) -> str:
+    text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, default=str)
+    max_chars = max_chars or PAYLOAD_MAX_CHARS
+    return text if len(text) <= max_chars else text[:max_chars] + f"... ({len(text)} chars)"
+
+
+class _RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        entry.update({k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        line = f"{self.formatTime(record)} {record.levelname:<7} {record.getMessage()}"
+        if getattr(record, "request_id", None):
+            line = f"{line} request_id={record.request_id}"
+        fields = {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS}
+        if fields:
+            line += " " + " ".join(f"{k}={json.dumps(v, ensure_ascii=False, default=str)}" for k, v in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        elif record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records instead of blocking when full"""
+
+    dropped = 0
+
+    def prepare(self, record):
+        # Only resolve args and the traceback here; formatting happens on the writer thread
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _DroppingQueueHandler.dropped += 1
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging():
+    """Send all logging through the background queue writer (idempotent)"""
+    global _listener
+    if _listener is not None:
+        return
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if os.getenv("LOG_FORMAT", "json").lower() == "json" else TextFormatter())
+
+    handler = _DroppingQueueHandler(queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", 10000))))
+    handler.addFilter(_RequestIdFilter())
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
+    _listener = logging.handlers.QueueListener(handler.queue, stream)
+    _listener.start()
+
+
+def stop_logging():
+    """Flush queued records (call on shutdown)"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def logging_stats() -> dict:
+    return {"level": logging.getLevelName(logging.getLogger().level), "dropped": _DroppingQueueHandler.dropped}
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor whose tasks run in a copy of the submitter's context"""
+
+    def submit(self, fn, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def propagate_context(module):
+    """Make ``module``'s ``concurrent.futures`` thread pools carry request context.
+
+    Mem0 runs its vector and graph work on its own thread pools; without
+    this their backend timings and logs lose the request they belong to.
+    Only ``module``'s reference is replaced, not the stdlib.
+    """
+    concurrent = getattr(module, "concurrent", None)
+    futures = getattr(concurrent, "futures", None)
+    if futures is None:
+        return
+    patched = SimpleNamespace(**{k: getattr(futures, k) for k in dir(futures) if not k.startswith("__")})
+    patched.ThreadPoolExecutor = ContextThreadPoolExecutor
+    module.concurrent = SimpleNamespace(futures=patched)
@@ -0,0 +1,128 @@
+"""
+Bulk deletion and TTL expiry of stored memories.
+
+``delete_in_batches`` deletes every point matching a Qdrant filter, one
+page at a time, handing each deleted page to a callback so derived state
+(lexical index, search cache, history, graph) can follow. ``MemoryReaper``
+runs an expiry pass on a background thread at a fixed interval.
+
+Memories expire through an ``expires_at`` payload timestamp, set from
+``ttl_seconds`` when they are added.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+import pytz
+from qdrant_client.models import DatetimeRange, FieldCondition, Filter, PointIdsList
+
+logger = logging.getLogger(__name__)
+
+
+def expires_at(ttl_seconds: Optional[float]) -> Optional[str]:
+    """Expiry timestamp for a TTL, in the same timezone Mem0 uses for created_at"""
+    if not ttl_seconds or ttl_seconds <= 0:
+        return None
+    return (datetime.now(pytz.timezone("US/Pacific")) + timedelta(seconds=ttl_seconds)).isoformat()
+
+
+def expired_filter(now: Optional[datetime] = None) -> Filter:
+    now = now or datetime.now(pytz.utc)
+    return Filter(must=[FieldCondition(key="expires_at", range=DatetimeRange(lt=now))])
+
+
+def delete_in_batches(
+    client,
+    collection_name: str,
+    scroll_filter: Filter,
+    on_batch: Callable[[List], None],
+    batch_size: int = 500,
+    max_points: Optional[int] = None,
+) -> int:
+    """Delete points matching ``scroll_filter``; return how many were deleted.
+
+    Each page is read (payload only), deleted by id and then passed to
+    ``on_batch``. Deleted points drop out of the filter, so every page is
+    read from the start. Stops after ``max_points`` when given.
+    """
+    deleted = 0
+    while max_points is None or deleted < max_points:
+        limit = batch_size if max_points is None else min(batch_size, max_points - deleted)
+        points, _ = client.scroll(
+            collection_name=collection_name,
+            scroll_filter=scroll_filter,
+            limit=limit,
+            with_payload=True,
+            with_vectors=False,
+        )
+        if not points:
+            break
+        client.delete(
+            collection_name=collection_name,
+            points_selector=PointIdsList(points=[point.id for point in points]),
+            wait=True,
+        )
+        deleted += len(points)
+        on_batch(points)
+        if len(points) < limit:
+            break
+    return deleted
+
+
+class MemoryReaper:
+    """Background thread that deletes expired memories every ``interval`` seconds"""
+
+    def __init__(self, reap: Callable[[], int], interval: float = 300.0):
+        self.reap = reap
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self.runs = 0
+        self.expired = 0
+        self.last_run = None
+        self.last_error = None
+
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="memory-reaper", daemon=True)
+        self._thread.start()
+        logger.info(f"⏳ Memory reaper started (every {self.interval:.0f}s)")
+
+    def stop(self, timeout: float = 10.0):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def run_once(self) -> int:
+        try:
+            expired = self.reap()
+            self.last_error = None
+        except Exception as e:
+            expired = 0
+            self.last_error = str(e)
+            logger.exception(f"⚠️  Memory reaper failed: {e}")
+        self.runs += 1
+        self.expired += expired
+        self.last_run = time.time()
+        if expired:
+            logger.info(f"⏳ Reaper expired {expired} memories")
+        return expired
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def stats(self) -> dict:
+        return {
+            "interval": self.interval,
+            "running": self._thread is not None,
+            "runs": self.runs,
+            "expired": self.expired,
+            "last_run": self.last_run,
+            "last_error": self.last_error,
+        }
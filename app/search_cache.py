@@ -0,0 +1,171 @@
+"""
+Per-user cache of /memory/search responses.
+
+A search hits the cache when the same user repeats a query (after
+normalisation) with the same parameters. With ``threshold`` below 1.0 it
+also hits when the query embedding is within that cosine similarity of a
+cached query - opt-in, since near-identical embeddings can still mean
+opposite things ("food I like" / "food I dislike"). A user's entries are
+dropped by ``invalidate_user`` whenever their memories change through the
+API (add/update/delete and tag patches).
+
+Searches take a ``token`` before they run and ``put`` rejects the result
+if the user was invalidated since, so a search racing a write never
+caches pre-write results.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from embedding_cache import normalize_query
+
+
+class _Entry:
+    __slots__ = ("vector", "result", "created")
+
+    def __init__(self, vector: Optional[np.ndarray], result):
+        self.vector = vector
+        self.result = result
+        self.created = time.monotonic()
+
+
+class _UserEntries:
+    def __init__(self, clock: int):
+        self.invalidated_at = clock
+        self.entries: "OrderedDict[tuple, _Entry]" = OrderedDict()
+
+
+class SearchCache:
+    """LRU of users, each with an LRU of recent search responses"""
+
+    def __init__(self, max_users: int = 1000, entries_per_user: int = 32,
+                 ttl: float = 60.0, threshold: float = 1.0):
+        self.max_users = max_users
+        self.entries_per_user = entries_per_user
+        self.ttl = ttl
+        self.threshold = threshold
+        self._users: "OrderedDict[str, _UserEntries]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._clock = 0
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.rejected_puts = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_users > 0 and self.entries_per_user > 0
+
+    @property
+    def semantic(self) -> bool:
+        return self.threshold < 1.0
+
+    def token(self) -> int:
+        """Take before searching; pass to ``put``"""
+        with self._lock:
+            return self._clock
+
+    def get(self, user_id: str, params: tuple, query: str, vector: Optional[List[float]] = None):
+        """Return a cached response for an exact or (given ``vector``) similar query, or None"""
+        key = (params, normalize_query(query))
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                self.misses += 1
+                return None
+            entry = self._fresh(user, key)
+            if entry is not None:
+                self.exact_hits += 1
+                return entry.result
+            if vector is not None and self.semantic:
+                unit = self._unit(vector)
+                best, best_score = None, self.threshold
+                for entry_key in [k for k in user.entries if k[0] == params]:
+                    entry = self._fresh(user, entry_key)
+                    if entry is None or entry.vector is None:
+                        continue
+                    score = float(np.dot(entry.vector, unit))
+                    if score >= best_score:
+                        best, best_score = entry, score
+                if best is not None:
+                    self.semantic_hits += 1
+                    return best.result
+            self.misses += 1
+            return None
+
+    def put(self, user_id: str, params: tuple, query: str, result, token: int,
+            vector: Optional[List[float]] = None):
+        key = (params, normalize_query(query))
+        unit = self._unit(vector) if vector is not None else None
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                user = self._users[user_id] = _UserEntries(self._clock)
+                while len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+            if user.invalidated_at > token:
+                self.rejected_puts += 1
+                return
+            self._users.move_to_end(user_id)
+            user.entries[key] = _Entry(unit, result)
+            user.entries.move_to_end(key)
+            while len(user.entries) > self.entries_per_user:
+                user.entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: Optional[str]):
+        """Drop every cached search of a user (after their memories changed)"""
+        if not user_id:
+            return
+        with self._lock:
+            self._clock += 1
+            self.invalidations += 1
+            user = self._users.get(user_id)
+            if user is not None:
+                user.entries.clear()
+                user.invalidated_at = self._clock
+            else:
+                # Remember the invalidation so in-flight searches can't cache stale results
+                self._users[user_id] = _UserEntries(self._clock)
+                while len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._clock += 1
+            self._users.clear()
+
+    def _fresh(self, user: _UserEntries, key: tuple) -> Optional[_Entry]:
+        entry = user.entries.get(key)
+        if entry is None:
+            return None
+        if self.ttl and time.monotonic() - entry.created > self.ttl:
+            del user.entries[key]
+            return None
+        user.entries.move_to_end(key)
+        return entry
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            hits = self.exact_hits + self.semantic_hits
+            total = hits + self.misses
+            return {
+                "users": len(self._users),
+                "entries": sum(len(user.entries) for user in self._users.values()),
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / total, 3) if total else 0.0,
+                "invalidations": self.invalidations,
+                "rejected_puts": self.rejected_puts,
+                "ttl": self.ttl,
+                "threshold": self.threshold,
+            }
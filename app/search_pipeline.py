@@ -0,0 +1,195 @@
+"""
+Post-retrieval stages for /memory/search.
+
+When a search asks for filtering, a score threshold or reranking, the
+vector (or hybrid) retrieval fetches ``oversample`` x ``limit`` candidates
+and ``SearchPipeline.run`` narrows them down:
+
+1. filter   - metadata / tag equality filters (a list matches any value)
+2. rerank   - optional local cross-encoder (e.g. bge-reranker-v2-m3 on
+              CPU, batched); its score replaces the retrieval score
+3. threshold - drop results scoring below ``min_score``
+4. top-k
+
+Reranking has its own time budget: it is skipped (results keep their
+retrieval order) when its estimated cost - measured per pair and
+including the queue ahead of it - exceeds ``rerank_budget_ms`` or would
+take the search past the overall ``budget_ms``.
+"""
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from executors import backends
+
+logger = logging.getLogger(__name__)
+
+
+class CrossEncoderReranker:
+    """Batched sentence-transformers CrossEncoder, loaded in the background"""
+
+    def __init__(self, model_name: str, batch_size: int = 16, max_length: int = 512, device: str = "cpu"):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.device = device
+        self.model = None
+        self.ms_per_pair: Optional[float] = None  # Moving average of the measured cost
+        self.calls = 0
+        self.last_error = None
+
+    @property
+    def ready(self) -> bool:
+        return self.model is not None
+
+    def start(self):
+        threading.Thread(target=self.load, name="reranker-load", daemon=True).start()
+
+    def load(self):
+        try:
+            from sentence_transformers import CrossEncoder
+
+            logger.info(f"📥 Loading reranker {self.model_name}...")
+            model = CrossEncoder(self.model_name, max_length=self.max_length, device=self.device)
+            # Warm up and take a first cost measurement
+            start = time.perf_counter()
+            model.predict([("warm up", "warm up query")] * self.batch_size, batch_size=self.batch_size)
+            self.ms_per_pair = (time.perf_counter() - start) * 1000.0 / self.batch_size
+            self.model = model
+            logger.info(f"✅ Reranker loaded ({self.ms_per_pair:.1f} ms/pair)")
+        except Exception as e:
+            self.last_error = str(e)
+            logger.exception(f"❌ Reranker failed to load: {e}")
+
+    def estimate_ms(self, pairs: int) -> float:
+        """Expected time to score ``pairs`` now, including calls queued ahead"""
+        limiter = backends["reranker"]
+        queued = limiter.active + limiter.waiting
+        return (self.ms_per_pair or 0.0) * pairs * (1 + queued / limiter.max_concurrency)
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        with backends["reranker"].slot("cross_encoder"):
+            start = time.perf_counter()
+            scores = self.model.predict([(query, text) for text in texts], batch_size=self.batch_size)
+            ms_per_pair = (time.perf_counter() - start) * 1000.0 / max(len(texts), 1)
+        self.ms_per_pair = ms_per_pair if self.ms_per_pair is None else 0.8 * self.ms_per_pair + 0.2 * ms_per_pair
+        self.calls += 1
+        return [float(s) for s in scores]
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model_name,
+            "ready": self.ready,
+            "ms_per_pair": round(self.ms_per_pair, 2) if self.ms_per_pair is not None else None,
+            "calls": self.calls,
+            "last_error": self.last_error,
+        }
+
+
+def _field(item: dict, key: str):
+    # Custom payload keys (tags, ...) are under "metadata" in Mem0 results
+    metadata = item.get("metadata") or {}
+    return metadata[key] if key in metadata else item.get(key)
+
+
+def matches_filters(item: dict, filters: Dict[str, object]) -> bool:
+    """Equality filters; a list of expected values (or stored values) matches on any overlap"""
+    for key, expected in filters.items():
+        allowed = expected if isinstance(expected, list) else [expected]
+        value = _field(item, key)
+        values = value if isinstance(value, list) else [value]
+        if not any(v in allowed for v in values):
+            return False
+    return True
+
+
+class SearchPipeline:
+    """Oversampling, filtering, reranking and thresholding of search candidates"""
+
+    def __init__(
+        self,
+        reranker: Optional[CrossEncoderReranker] = None,
+        oversample: int = 3,
+        max_candidates: int = 100,
+        budget_ms: float = 0.0,
+        rerank_budget_ms: float = 300.0,
+        rerank_by_default: bool = False,
+    ):
+        self.reranker = reranker
+        self.oversample = oversample
+        self.max_candidates = max_candidates
+        self.budget_ms = budget_ms
+        self.rerank_budget_ms = rerank_budget_ms
+        self.rerank_by_default = rerank_by_default
+        self._lock = threading.Lock()
+        self.reranked = 0
+        self.rerank_skipped = 0
+
+    def candidates(self, limit: int, active: bool, oversample: Optional[int] = None) -> int:
+        """How many results to retrieve for a top-``limit`` search"""
+        if not active:
+            return limit
+        return max(limit, min(limit * (oversample or self.oversample), self.max_candidates))
+
+    def run(
+        self,
+        query: str,
+        items: List[dict],
+        limit: int,
+        filters: Optional[Dict[str, object]] = None,
+        min_score: Optional[float] = None,
+        rerank: bool = False,
+        started: Optional[float] = None,
+        budget_ms: Optional[float] = None,
+    ) -> tuple:
+        """Return (top-``limit`` items, pipeline report)"""
+        report = {"candidates": len(items)}
+        if filters:
+            items = [item for item in items if matches_filters(item, filters)]
+            report["filtered"] = len(items)
+
+        if rerank:
+            report["rerank"] = self._rerank(query, items, started, budget_ms)
+            if report["rerank"] == "applied":
+                items = sorted(items, key=lambda item: item["score"], reverse=True)
+
+        if min_score is not None:
+            items = [item for item in items if (item.get("score") or 0.0) >= min_score]
+        report["returned"] = min(len(items), limit)
+        return items[:limit], report
+
+    def _rerank(self, query: str, items: List[dict], started: Optional[float], budget_ms: Optional[float]) -> str:
+        if not items:
+            return "applied"
+        if self.reranker is None:
+            return "unavailable"
+        if not self.reranker.ready:
+            return "loading"
+
+        estimate = self.reranker.estimate_ms(len(items))
+        budget_ms = self.budget_ms if budget_ms is None else budget_ms
+        remaining = budget_ms - (time.perf_counter() - started) * 1000.0 if budget_ms and started else None
+        if estimate > self.rerank_budget_ms or (remaining is not None and estimate > remaining):
+            with self._lock:
+                self.rerank_skipped += 1
+            return "skipped_budget"
+
+        scores = self.reranker.score(query, [item.get("memory") or item.get("data") or "" for item in items])
+        for item, score in zip(items, scores):
+            item["retrieval_score"] = item.get("score")
+            item["rerank_score"] = round(score, 6)
+            item["score"] = item["rerank_score"]
+        with self._lock:
+            self.reranked += 1
+        return "applied"
+
+    def stats(self) -> dict:
+        return {
+            "oversample": self.oversample,
+            "budget_ms": self.budget_ms,
+            "rerank_budget_ms": self.rerank_budget_ms,
+            "reranked": self.reranked,
+            "rerank_skipped": self.rerank_skipped,
+            "reranker": self.reranker.stats() if self.reranker else None,
+        }
@@ -0,0 +1,107 @@
+"""
+Background backend initialisation with per-backend readiness.
+
+Backends (embedder + vector store, graph store, ...) are initialised
+concurrently on daemon threads so the API can bind immediately. Optional
+backends that fail are retried in the background while the API serves in
+a degraded mode (e.g. vector-only until Neo4j is up).
+"""
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BackendStatus:
+    STARTING = "starting"
+    READY = "ready"
+    FAILED = "failed"
+    DISABLED = "disabled"
+
+
+class _Backend:
+    def __init__(self, name: str, init: Callable[[], None], required: bool, retry_interval: Optional[float]):
+        self.name = name
+        self.init = init
+        self.required = required
+        self.retry_interval = retry_interval
+        self.status = BackendStatus.STARTING
+        self.error: Optional[str] = None
+        self.attempts = 0
+        self.started_at: Optional[float] = None
+        self.ready_after: Optional[float] = None
+        self.ready_event = threading.Event()
+
+
+class BackendManager:
+    """Initialise registered backends in parallel and track their readiness"""
+
+    def __init__(self):
+        self._backends: Dict[str, _Backend] = {}
+
+    def register(self, name: str, init: Callable[[], None], required: bool = True,
+                 retry_interval: Optional[float] = None):
+        """Register a backend.
+
+        ``init`` runs on its own thread and should raise on failure. When
+        ``retry_interval`` is set, a failed init is retried after that many
+        seconds until it succeeds.
+        """
+        self._backends[name] = _Backend(name, init, required, retry_interval)
+
+    def disable(self, name: str):
+        backend = self._backends[name]
+        backend.status = BackendStatus.DISABLED
+
+    def start(self):
+        for backend in self._backends.values():
+            if backend.status == BackendStatus.DISABLED:
+                continue
+            backend.started_at = time.time()
+            threading.Thread(target=self._run, args=(backend,), name=f"init-{backend.name}", daemon=True).start()
+
+    def _run(self, backend: _Backend):
+        while True:
+            backend.attempts += 1
+            try:
+                backend.init()
+                backend.status = BackendStatus.READY
+                backend.error = None
+                backend.ready_after = round(time.time() - backend.started_at, 2)
+                backend.ready_event.set()
+                logger.info(f"✅ Backend '{backend.name}' ready after {backend.ready_after}s")
+                return
+            except Exception as e:
+                backend.status = BackendStatus.FAILED
+                backend.error = str(e)
+                logger.exception(f"❌ Backend '{backend.name}' failed to initialise: {e}")
+                if not backend.retry_interval:
+                    return
+                time.sleep(backend.retry_interval)
+
+    def is_ready(self, name: str) -> bool:
+        backend = self._backends.get(name)
+        return backend is not None and backend.status == BackendStatus.READY
+
+    def wait(self, name: str, timeout: Optional[float] = None) -> bool:
+        """Block until ``name`` is ready (used by backends that depend on another)"""
+        return self._backends[name].ready_event.wait(timeout)
+
+    def readiness(self) -> dict:
+        backends = {
+            name: {
+                "status": backend.status,
+                "required": backend.required,
+                "attempts": backend.attempts,
+                "ready_after_seconds": backend.ready_after,
+                "error": backend.error,
+            }
+            for name, backend in self._backends.items()
+        }
+        ready = all(
+            backend.status == BackendStatus.READY
+            for backend in self._backends.values() if backend.required
+        )
+        return {"ready": ready, "backends": backends}
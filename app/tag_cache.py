@@ -0,0 +1,125 @@
+"""
+Content-addressed cache for generated tags.
+
+Keys are a hash of the normalised memory text, so repeated greetings and
+facts reuse earlier LLM output. Entries live in an in-process LRU with a
+TTL and can optionally be persisted to SQLite so restarts keep them. The
+SQLite table is pruned on open and every ``prune_every`` writes: expired
+rows are deleted, then the oldest rows beyond ``max_size``.
+"""
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import List, Optional
+
+
+def normalize_text(text: str) -> str:
+    """Normalise text so trivially different inputs share a cache key"""
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    text = re.sub(r"\s+", " ", text).strip()
+    # Trailing punctuation ("hello!" vs "hello") does not change the tags
+    return text.strip(" .,!?;:'\"")
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class TagCache:
+    """LRU/TTL tag cache with an optional SQLite backing store"""
+
+    def __init__(self, max_size: int = 10000, ttl: float = 7 * 24 * 3600, path: Optional[str] = None,
+                 prune_every: int = 100):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path
+        self.prune_every = prune_every
+        self._writes = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS tag_cache ("
+                "key TEXT PRIMARY KEY, tags TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS tag_cache_created ON tag_cache (created_at)")
+            self._prune()
+            self._db.commit()
+
+    def get(self, text: str) -> Optional[List[str]]:
+        key = text_key(text)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._db is not None:
+                row = self._db.execute(
+                    "SELECT tags, created_at FROM tag_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row:
+                    entry = (json.loads(row[0]), row[1])
+                    self._store(key, entry)
+            if entry is not None and now - entry[1] > self.ttl:
+                self._evict(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(entry[0])
+
+    def set(self, text: str, tags: List[str]):
+        key = text_key(text)
+        entry = (list(tags), time.time())
+        with self._lock:
+            self._store(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO tag_cache (key, tags, created_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(entry[0]), entry[1]),
+                )
+                self._writes += 1
+                if self._writes % self.prune_every == 0:
+                    self._prune()
+                self._db.commit()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "persistent": self._db is not None,
+        }
+
+    def _store(self, key: str, entry: tuple):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _prune(self):
+        # Caller holds self._lock (or is __init__); drop expired rows, then the oldest over max_size
+        self._db.execute("DELETE FROM tag_cache WHERE created_at < ?", (time.time() - self.ttl,))
+        self._db.execute(
+            "DELETE FROM tag_cache WHERE key IN "
+            "(SELECT key FROM tag_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_size,),
+        )
+
+    def _evict(self, key: str):
+        self._entries.pop(key, None)
+        if self._db is not None:
+            self._db.execute("DELETE FROM tag_cache WHERE key = ?", (key,))
+            self._db.commit()
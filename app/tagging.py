@@ -0,0 +1,256 @@
+"""
+Tag generation for memories, plus a background worker queue so that
+tagging runs after a memory is stored instead of on the request path.
+"""
+import contextvars
+import logging
+import os
+import re
+import queue
+import threading
+from typing import Callable, List, Optional
+
+from llm_client import get_llm_client
+from request_log import stage
+from tag_cache import TagCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TAGS = ["general"]
+
+# Tags for repeated texts are served from here instead of the LLM
+tag_cache = TagCache(
+    max_size=int(os.getenv("TAG_CACHE_SIZE", 10000)),
+    ttl=float(os.getenv("TAG_CACHE_TTL", 7 * 24 * 3600)),
+    path=os.getenv("TAG_CACHE_PATH") or None,
+)
+
+
+def generate_tags(text: str) -> list:
+    """Generate tags for a memory using LLM (cached by normalised text)"""
+    tags = tag_cache.get(text)
+    if tags is not None:
+        return tags
+    with stage("tagging", "generate_tags"):
+        tags = _request_tags(text)
+    if tags is None:
+        return list(DEFAULT_TAGS)
+    tag_cache.set(text, tags)
+    return tags
+
+
+def _request_tags(text: str) -> Optional[list]:
+    """Ask the LLM for tags. Returns None if no usable tags came back."""
+    try:
+        # Create prompt for tag generation
+        prompt = f"""Generate 2-4 short tags (single words) for this memory: "{text}"
+
+Examples: work, food, sports, preference, tech, personal, travel, health
+
+Return ONLY comma-separated tags, like: work, tech, personal
+
+Tags:"""
+
+        # Call LLM with more tokens (shared pooled client)
+        response = get_llm_client().chat(
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=1500,
+            temperature=0.3
+        )
+
+        content = _response_content(response)
+        if not content:
+            logger.warning("⚠️  LLM returned no content for tags")
+            return None
+
+        tags_text = content.strip()
+        tags = _parse_tags(tags_text)
+
+        if not tags:
+            logger.warning("⚠️  No valid tags in LLM reply", extra={"reply": tags_text[:200]})
+            return None
+
+        logger.debug("✅ Generated tags", extra={"tags": tags})
+        return tags
+
+    except Exception as e:
+        logger.exception(f"❌ Tag generation error: {e}")
+        return None
+
+
+def generate_tags_batch(texts: List[str], chunk_size: int = 20) -> List[list]:
+    """Generate tags for many texts with one multi-item prompt per chunk"""
+    results: List[Optional[list]] = [tag_cache.get(text) for text in texts]
+    missing = [i for i, tags in enumerate(results) if tags is None]
+    for start in range(0, len(missing), chunk_size):
+        chunk = missing[start:start + chunk_size]
+        with stage("tagging", "generate_tags_batch"):
+            chunk_tags = _request_tags_batch([texts[i] for i in chunk])
+        for i, tags in zip(chunk, chunk_tags):
+            if tags:
+                tag_cache.set(texts[i], tags)
+                results[i] = tags
+    return [tags if tags else list(DEFAULT_TAGS) for tags in results]
+
+
+def _request_tags_batch(texts: List[str]) -> List[Optional[list]]:
+    """Ask the LLM for tags for several memories in a single call"""
+    results: List[Optional[list]] = [None] * len(texts)
+    try:
+        numbered = "\n".join(f'{i + 1}. "{text}"' for i, text in enumerate(texts))
+        prompt = f"""Generate 2-4 short tags (single words) for each of these memories:
+{numbered}
+
+Examples: work, food, sports, preference, tech, personal, travel, health
+
+Return ONLY one line per memory, numbered to match, with comma-separated tags, like:
+1: work, tech, personal
+2: food, preference
+
+Tags:"""
+
+        response = get_llm_client().chat(
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=min(1500 + 100 * len(texts), 8000),
+            temperature=0.3
+        )
+
+        content = _response_content(response)
+        if not content:
+            logger.warning(f"⚠️  LLM returned no content for batch of {len(texts)}")
+            return results
+
+        for line in content.strip().splitlines():
+            match = re.match(r'\s*(\d+)\s*[:.)-]\s*(.+)', line)
+            if not match:
+                continue
+            index = int(match.group(1)) - 1
+            if 0 <= index < len(texts) and results[index] is None:
+                results[index] = _parse_tags(match.group(2)) or None
+        logger.info(f"✅ Generated tags for {sum(1 for r in results if r)}/{len(texts)} memories")
+        return results
+
+    except Exception as e:
+        logger.exception(f"❌ Batch tag generation error: {e}")
+        return results
+
+
+def _response_content(response) -> Optional[str]:
+    """Parse response - check both content and reasoning_content"""
+    if hasattr(response, 'choices') and len(response.choices) > 0:
+        choice = response.choices[0]
+        if hasattr(choice, 'message'):
+            # Try content first, then reasoning_content
+            return getattr(choice.message, 'content', None) or getattr(choice.message, 'reasoning_content', None)
+    return None
+
+
+def _parse_tags(tags_text: str) -> list:
+    """Extract tags from an LLM response line (handle various formats)"""
+    # Remove common prefixes
+    tags_text = tags_text.replace("Tags:", "").replace("tags:", "")
+
+    # Clean and split tags
+    tags = [tag.strip().strip('"').lower() for tag in re.split(r'[,;]', tags_text) if tag.strip()]
+
+    # Filter and limit
+    return [t for t in tags if t and len(t) > 1 and len(t) < 20][:4]
+
+
+class TagWorker:
+    """Background queue that tags stored memories and patches their payload.
+
+    Jobs are ``(memory_ids, text)`` pairs. Each worker thread generates tags
+    for ``text`` and hands them to ``apply_tags(memory_ids, tags)``, which is
+    responsible for writing them to the vector store.
+    """
+
+    def __init__(
+        self,
+        apply_tags: Callable[[List[str], List[str]], None],
+        num_workers: int = 2,
+        max_queue_size: int = 1000,
+    ):
+        self.apply_tags = apply_tags
+        self.num_workers = num_workers
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=max_queue_size)
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+        self._discarded = 0
+
+    def start(self):
+        """Start the worker threads (idempotent)"""
+        if self._threads:
+            return
+        self._stopping = False
+        for i in range(self.num_workers):
+            thread = threading.Thread(target=self._run, name=f"tag-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"🏷️  Tag worker started with {self.num_workers} thread(s)")
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the worker threads without draining the queue.
+
+        Jobs already running finish (waiting up to ``timeout`` per thread);
+        queued jobs are discarded, leaving those memories untagged.
+        """
+        self._stopping = True
+        for _ in self._threads:
+            try:
+                self._queue.put_nowait(None)  # Wake idle workers; busy ones see the flag
+            except queue.Full:
+                break
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._discarded += job is not None
+        if self._discarded:
+            logger.warning(f"⚠️  Tag worker stopped with {self._discarded} job(s) pending, memories left untagged")
+        self._discarded = 0
+
+    def submit(self, memory_ids: List[str], text: str) -> bool:
+        """Queue a tagging job. Returns False if the queue is full."""
+        if not memory_ids:
+            return True
+        if self._stopping:
+            return False
+        try:
+            # Jobs run in the submitting request's context, so their logs keep its ID
+            self._queue.put_nowait((list(memory_ids), text, contextvars.copy_context()))
+            return True
+        except queue.Full:
+            logger.warning("⚠️  Tag queue full, dropping tagging", extra={"memory_ids": memory_ids})
+            return False
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _tag(self, memory_ids: List[str], text: str):
+        self.apply_tags(memory_ids, generate_tags(text))
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                if self._stopping:
+                    self._discarded += 1
+                    return
+                memory_ids, text, context = job
+                context.run(self._tag, memory_ids, text)
+            except Exception as e:
+                logger.exception(f"❌ Tag worker error: {e}")
+            finally:
+                self._queue.task_done()
@@ -7,6 +7,14 @@ from sentence_transformers import SentenceTransformer
 
 load_dotenv()
 
+# Thai/English samples (also used by test_onnx_embedding.py)
+SAMPLE_TEXTS = [
+    "สวัสดีครับ",
+    "Hello, how are you?",
+    "Python programming is fun",
+    "การเขียนโปรแกรมสนุกมาก"
+]
+
 def test_local_embedding():
     """Test local embedding model"""
     model_name = os.getenv("EMBEDDING_MODEL", "BAAI/bge-m3")
@@ -24,12 +32,7 @@ def test_local_embedding():
         
         # Test embedding
         print("🧪 Testing embedding generation...")
-        texts = [
-            "สวัสดีครับ",
-            "Hello, how are you?",
-            "Python programming is fun",
-            "การเขียนโปรแกรมสนุกมาก"
-        ]
+        texts = SAMPLE_TEXTS
         
         embeddings = model.encode(texts)
         
@@ -0,0 +1,137 @@
+"""
+Ingest queue tests: claiming, retries, deferral and lease requeue
+"""
+import threading
+import time
+
+from ingest_queue import IngestQueue, content_key
+
+
+class Unavailable(Exception):
+    pass
+
+
+def make_queue(tmp_path, process, **kwargs):
+    kwargs.setdefault("retry_delay", 0.0)
+    return IngestQueue(str(tmp_path / "ingest.db"), process, num_workers=1, **kwargs)
+
+
+def wait_for(queue, job_id, status, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job["status"] == status:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} is {queue.get(job_id)['status']}, expected {status}")
+
+
+def test_claim_is_exclusive(tmp_path):
+    """Two queues on one file never claim the same job"""
+    first = make_queue(tmp_path, lambda payload: None)
+    second = make_queue(tmp_path, lambda payload: None)
+    job_id, _ = first.enqueue({"n": 1}, "key-1")
+
+    with first._lock:
+        claimed = first._claim()
+    with second._lock:
+        assert second._claim() is None
+    assert claimed[0] == job_id and claimed[2] == 1
+
+    row = first._db.execute("SELECT status, owner FROM ingest_jobs WHERE id = ?", (job_id,)).fetchone()
+    assert row == ("running", first.owner)
+
+
+def test_duplicate_enqueue(tmp_path):
+    queue = make_queue(tmp_path, lambda payload: None)
+    payload = {"messages": "hello", "user_id": "u1"}
+    key = content_key(payload, ["messages", "user_id"])
+    job_id, duplicate = queue.enqueue(payload, key)
+    assert not duplicate
+    assert queue.enqueue(payload, key) == (job_id, True)
+
+
+def test_retry_then_done(tmp_path):
+    calls = []
+
+    def process(payload):
+        calls.append(payload)
+        if len(calls) < 3:
+            raise RuntimeError("boom")
+        return {"ok": True}
+
+    queue = make_queue(tmp_path, process, max_attempts=5)
+    job_id, _ = queue.enqueue({"n": 1}, "key-1")
+    queue.start()
+    try:
+        job = wait_for(queue, job_id, "done")
+    finally:
+        queue.stop()
+    assert job["attempts"] == 3
+    assert job["result"] == {"ok": True}
+    assert queue.retried == 2
+
+
+def test_fails_after_max_attempts(tmp_path):
+    def process(payload):
+        raise RuntimeError("boom")
+
+    queue = make_queue(tmp_path, process, max_attempts=2)
+    job_id, _ = queue.enqueue({"n": 1}, "key-1")
+    queue.start()
+    try:
+        job = wait_for(queue, job_id, "failed")
+    finally:
+        queue.stop()
+    assert job["attempts"] == 2
+    assert job["error"] == "boom"
+
+
+def test_waits_for_ready_and_defers_transient_errors(tmp_path):
+    """Jobs wait for the backend; 'still starting' failures do not use up attempts"""
+    ready = threading.Event()
+    failures = []
+
+    def process(payload):
+        if len(failures) < 4:
+            failures.append(1)
+            raise Unavailable("starting")
+        return "ok"
+
+    queue = make_queue(
+        tmp_path, process, max_attempts=2,
+        ready=lambda timeout: ready.wait(min(timeout, 0.05)),
+        transient=lambda e: isinstance(e, Unavailable),
+    )
+    job_id, _ = queue.enqueue({"n": 1}, "key-1")
+    queue.start()
+    try:
+        time.sleep(0.2)
+        assert queue.get(job_id)["status"] == "queued"
+        ready.set()
+        job = wait_for(queue, job_id, "done")
+    finally:
+        queue.stop()
+    assert job["attempts"] == 1
+    assert queue.deferred == 4
+
+
+def test_requeues_only_expired_leases(tmp_path):
+    """A job running under a live lease stays put; an expired one is queued again"""
+    crashed = make_queue(tmp_path, lambda payload: None, lease=60.0)
+    job_id, _ = crashed.enqueue({"n": 1}, "key-1")
+    with crashed._lock:
+        crashed._claim()
+
+    other = make_queue(tmp_path, lambda payload: "ok")
+    assert other.requeue_expired() == 0
+    assert other.get(job_id)["status"] == "running"
+
+    other._db.execute("UPDATE ingest_jobs SET lease_until = ? WHERE id = ?", (time.time() - 1, job_id))
+    other.start()
+    try:
+        job = wait_for(other, job_id, "done")
+    finally:
+        other.stop()
+    assert job["attempts"] == 2
+
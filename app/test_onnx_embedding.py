@@ -0,0 +1,72 @@
+"""
+Parity test: ONNX (optionally int8) embedder vs the reference model
+"""
+import os
+import time
+from dotenv import load_dotenv
+import numpy as np
+from sentence_transformers import SentenceTransformer
+from onnx_embedder import OnnxEmbedding
+from test_embedding import SAMPLE_TEXTS
+
+load_dotenv()
+
+# Cosine deviation (1 - cosine) above this counts as a parity failure
+MAX_DEVIATION = float(os.getenv("ONNX_MAX_DEVIATION", 0.02))
+
+def test_onnx_parity():
+    """Compare ONNX embeddings with the SentenceTransformer reference"""
+    model_name = os.getenv("EMBEDDING_MODEL", "BAAI/bge-m3")
+    quantize = os.getenv("ONNX_QUANTIZE", "true").lower() == "true"
+    
+    print("🔍 Testing ONNX Embedding Parity")
+    print(f"   Model: {model_name}")
+    print(f"   Quantized (int8): {quantize}")
+    print()
+    
+    print("📥 Loading reference model...")
+    reference = SentenceTransformer(model_name)
+    print("📥 Loading ONNX model (first run exports it)...")
+    onnx = OnnxEmbedding(
+        model_name=model_name,
+        model_dir=os.getenv("ONNX_MODEL_DIR", "/data/onnx"),
+        quantize=quantize,
+    )
+    print()
+    
+    # Warm up both models so the timings below compare steady-state inference
+    reference.encode(SAMPLE_TEXTS[:1])
+    onnx.encode(SAMPLE_TEXTS[:1])
+    
+    start = time.perf_counter()
+    expected = reference.encode(SAMPLE_TEXTS, convert_to_numpy=True, normalize_embeddings=True)
+    reference_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    actual = onnx.encode(SAMPLE_TEXTS)
+    onnx_time = time.perf_counter() - start
+    
+    deviations = 1.0 - np.sum(expected * actual, axis=1)
+    print("   Cosine deviation (1 - cosine) per sample:")
+    for text, deviation in zip(SAMPLE_TEXTS, deviations):
+        print(f"     {text}: {deviation:.6f}")
+    print()
+    print(f"   Mean deviation: {deviations.mean():.6f}")
+    print(f"   Max deviation:  {deviations.max():.6f} (limit {MAX_DEVIATION})")
+    print(f"   Reference time: {reference_time * 1000:.1f} ms")
+    print(f"   ONNX time:      {onnx_time * 1000:.1f} ms ({reference_time / onnx_time:.1f}x)")
+    print()
+    
+    if deviations.max() > MAX_DEVIATION:
+        print("❌ ONNX embeddings deviate too much from the reference model")
+    else:
+        print("✅ ONNX embeddings match the reference model")
+    assert deviations.max() <= MAX_DEVIATION, f"max deviation {deviations.max():.6f} > {MAX_DEVIATION}"
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("ONNX Embedding Parity Test")
+    print("=" * 60)
+    print()
+    
+    test_onnx_parity()
@@ -0,0 +1,176 @@
+"""
+Qdrant collection settings: quantisation and HNSW tuning.
+
+The Mem0 collection is created here (before Mem0 connects, so Mem0 finds
+it and keeps our settings) with optional int8 scalar or binary
+quantisation, on-disk original vectors and HNSW m/ef_construct. Search
+calls get the configured ``hnsw_ef`` and quantisation rescoring.
+
+Existing collections are migrated in place (Qdrant re-indexes in the
+background):
+    python vector_collection.py            # show current vs configured settings
+    python vector_collection.py migrate    # apply the configured settings
+"""
+import logging
+import os
+import sys
+from typing import Optional
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    Disabled,
+    Distance,
+    HnswConfigDiff,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    VectorParams,
+    VectorParamsDiff,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _optional_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+class CollectionSettings:
+    """Collection and search settings read from the environment"""
+
+    def __init__(self):
+        self.quantization = os.getenv("QDRANT_QUANTIZATION", "none").lower()  # none | scalar | binary
+        if self.quantization not in ("none", "scalar", "binary"):
+            raise ValueError(f"QDRANT_QUANTIZATION must be none, scalar or binary, got '{self.quantization}'")
+        self.quantile = float(os.getenv("QDRANT_QUANTIZATION_QUANTILE", 0.99))
+        self.always_ram = os.getenv("QDRANT_QUANTIZATION_ALWAYS_RAM", "true").lower() == "true"
+        self.rescore = os.getenv("QDRANT_RESCORE", "true").lower() == "true"
+        # Binary codes lose more precision, so fetch more candidates to rescore
+        default_oversampling = 3.0 if self.quantization == "binary" else 1.5
+        self.oversampling = float(os.getenv("QDRANT_OVERSAMPLING", default_oversampling))
+        self.vectors_on_disk = os.getenv("QDRANT_VECTORS_ON_DISK", "false").lower() == "true"
+        self.hnsw_m = _optional_int("QDRANT_HNSW_M")
+        self.hnsw_ef_construct = _optional_int("QDRANT_HNSW_EF_CONSTRUCT")
+        self.hnsw_ef = _optional_int("QDRANT_HNSW_EF")
+
+    def quantization_config(self):
+        if self.quantization == "scalar":
+            return ScalarQuantization(scalar=ScalarQuantizationConfig(
+                type=ScalarType.INT8, quantile=self.quantile, always_ram=self.always_ram,
+            ))
+        if self.quantization == "binary":
+            return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=self.always_ram))
+        return None
+
+    def hnsw_config(self) -> Optional[HnswConfigDiff]:
+        if self.hnsw_m is None and self.hnsw_ef_construct is None:
+            return None
+        return HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct)
+
+    def search_params(self) -> Optional[SearchParams]:
+        quantization = None
+        if self.quantization != "none":
+            quantization = QuantizationSearchParams(rescore=self.rescore, oversampling=self.oversampling)
+        if quantization is None and self.hnsw_ef is None:
+            return None
+        return SearchParams(hnsw_ef=self.hnsw_ef, quantization=quantization)
+
+    def describe(self) -> dict:
+        return {
+            "quantization": self.quantization,
+            "quantile": self.quantile if self.quantization == "scalar" else None,
+            "always_ram": self.always_ram,
+            "rescore": self.rescore,
+            "oversampling": self.oversampling,
+            "vectors_on_disk": self.vectors_on_disk,
+            "hnsw_m": self.hnsw_m,
+            "hnsw_ef_construct": self.hnsw_ef_construct,
+            "hnsw_ef": self.hnsw_ef,
+        }
+
+
+def ensure_collection(client: QdrantClient, name: str, dims: int, settings: CollectionSettings) -> bool:
+    """Create the collection with the configured settings; return False if it already exists"""
+    if client.collection_exists(name):
+        vectors = client.get_collection(name).config.params.vectors
+        size = getattr(vectors, "size", None)
+        if size is not None and size != dims:
+            raise RuntimeError(
+                f"Qdrant collection '{name}' stores {size}-dim vectors but {dims} are configured; "
+                "use a new QDRANT_COLLECTION when changing EMBEDDING_DIMS"
+            )
+        return False
+    client.create_collection(
+        collection_name=name,
+        vectors_config=VectorParams(size=dims, distance=Distance.COSINE, on_disk=settings.vectors_on_disk),
+        hnsw_config=settings.hnsw_config(),
+        quantization_config=settings.quantization_config(),
+    )
+    logger.info(f"✅ Created Qdrant collection '{name}' ({dims} dims, quantization={settings.quantization})")
+    return True
+
+
+def migrate_collection(client: QdrantClient, name: str, settings: CollectionSettings):
+    """Apply the configured settings to an existing collection (re-indexes in the background)"""
+    client.update_collection(
+        collection_name=name,
+        vectors_config={"": VectorParamsDiff(on_disk=settings.vectors_on_disk)},
+        hnsw_config=settings.hnsw_config(),
+        quantization_config=settings.quantization_config() or Disabled.DISABLED,
+    )
+    logger.info(f"✅ Updated Qdrant collection '{name}': {settings.describe()}")
+
+
+def install_search_params(client, settings: CollectionSettings):
+    """Default ``search_params`` on a client's search calls (Mem0 does not pass any)"""
+    params = settings.search_params()
+    if params is None:
+        return
+
+    def with_params(method):
+        def search(*args, **kwargs):
+            if kwargs.get("search_params") is None:
+                kwargs["search_params"] = params
+            return method(*args, **kwargs)
+        return search
+
+    for name in ["search", "query_points"]:
+        method = getattr(client, name, None)
+        if callable(method):
+            setattr(client, name, with_params(method))
+
+
+def collection_summary(client: QdrantClient, name: str) -> dict:
+    """Current vector, HNSW and quantisation settings of a collection"""
+    info = client.get_collection(name)
+    params = info.config.params
+    return {
+        "status": str(info.status),
+        "points": info.points_count,
+        "indexed_vectors": info.indexed_vectors_count,
+        "vectors": params.vectors.model_dump(mode="json") if hasattr(params.vectors, "model_dump") else params.vectors,
+        "hnsw": info.config.hnsw_config.model_dump(mode="json"),
+        "quantization": info.config.quantization_config.model_dump(mode="json") if info.config.quantization_config else None,
+    }
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    collection = os.getenv("QDRANT_COLLECTION", "mem0")
+    qdrant = QdrantClient(host=os.getenv("QDRANT_HOST", "localhost"), port=int(os.getenv("QDRANT_PORT", 6333)))
+    configured = CollectionSettings()
+
+    print(f"📋 Configured settings: {configured.describe()}")
+    print(f"📋 Current '{collection}': {collection_summary(qdrant, collection)}")
+    if len(sys.argv) > 1 and sys.argv[1] == "migrate":
+        migrate_collection(qdrant, collection, configured)
+        print(f"📋 After migration: {collection_summary(qdrant, collection)}")
+        print("ℹ️  Qdrant rebuilds quantised vectors/HNSW in the background; watch 'status' return to green")